@@ -0,0 +1,32 @@
+"""
+Compare two stored benchmark runs.
+
+Exits with status 1 if any benchmark of the current run regressed
+against the baseline.
+
+    python benchmarks/compare.py latest.json baseline.json --threshold 0.1
+"""
+import argparse
+import sys
+
+from harness import compare, format_regressions, load
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Flag benchmark regressions against a baseline run.")
+    parser.add_argument("current", help="the JSON results of the run to check")
+    parser.add_argument("baseline", help="the JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="tolerated relative slowdown (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    current, baseline = load(args.current), load(args.baseline)
+    if current["meta"].get("rows") != baseline["meta"].get("rows"):
+        print("Warning: the runs used databases of different sizes", file=sys.stderr)
+
+    regressions = compare(current["results"], baseline["results"], args.threshold)
+    print(format_regressions(regressions))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Timing, memory and baseline comparison helpers of the benchmark suite.
+"""
+import gc
+import json
+import time
+import tracemalloc
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+# The statistics compared against a baseline
+COMPARED = ("p50_ms", "p95_ms", "peak_kib")
+
+# Differences below these are noise, however large the ratio
+MIN_DELTA = {"p50_ms": 0.05, "p95_ms": 0.1, "p99_ms": 0.1, "peak_kib": 64}
+
+
+class Benchmark(NamedTuple):
+    """
+    A named operation to time.
+
+    `func` is called with the iteration number, which benchmarks use to
+    cycle through entity ids. `setup`, if given, runs untimed before
+    every iteration, e.g. to clear a cache the benchmark must miss.
+    """
+
+    name: str
+    func: Callable[[int], object]
+    setup: Optional[Callable[[], object]] = None
+
+
+def measure(benchmark, repeat=50, warmup=3):
+    """
+    Time `repeat` calls of a benchmark, then trace one call's memory.
+
+    Memory is traced in a separate call because tracemalloc slows every
+    allocation down and would distort the timings.
+
+    Returns
+    -------
+    dict
+        The statistics returned by `summarize`
+    """
+    for i in range(warmup):
+        if benchmark.setup is not None:
+            benchmark.setup()
+        benchmark.func(i)
+
+    gc.collect()
+    timings = []
+    for i in range(repeat):
+        if benchmark.setup is not None:
+            benchmark.setup()
+        started = time.perf_counter()
+        benchmark.func(i)
+        timings.append(time.perf_counter() - started)
+
+    if benchmark.setup is not None:
+        benchmark.setup()
+    tracemalloc.start()
+    try:
+        benchmark.func(0)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return summarize(timings, peak)
+
+
+def summarize(timings, peak=0):
+    """
+    Reduce timings in seconds to milliseconds statistics.
+
+    Returns
+    -------
+    dict
+        The number of calls, the mean, min, max and p50/p95/p99 times
+        in milliseconds, and the traced memory peak in KiB
+    """
+    ms = np.asarray(timings, dtype=float) * 1000
+    stats = {"n": len(ms), "mean_ms": float(ms.mean()), "min_ms": float(ms.min())}
+    for percentile, value in zip(PERCENTILES, np.percentile(ms, PERCENTILES)):
+        stats[f"p{percentile}_ms"] = float(value)
+    stats["max_ms"] = float(ms.max())
+    stats["peak_kib"] = peak / 1024
+    return stats
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    List the statistics that got worse than the baseline's.
+
+    A statistic regresses when it exceeds the baseline value by more
+    than `threshold` (a fraction) and by more than its noise floor in
+    `MIN_DELTA`. Benchmarks missing from either side are ignored.
+
+    Parameters
+    ----------
+    results, baseline : dict
+        The "results" of two benchmark runs, keyed by benchmark name
+    threshold : float
+        The tolerated relative increase
+
+    Returns
+    -------
+    list of dict
+        One entry per regression with the benchmark name, statistic,
+        baseline and current values, and their ratio
+    """
+    regressions = []
+    for name in sorted(results.keys() & baseline.keys()):
+        for stat in COMPARED:
+            before, after = baseline[name].get(stat), results[name].get(stat)
+            if before is None or after is None:
+                continue
+            if after > before * (1 + threshold) and after - before > MIN_DELTA[stat]:
+                regressions.append({
+                    "name": name,
+                    "stat": stat,
+                    "baseline": before,
+                    "current": after,
+                    "ratio": after / before if before else float("inf"),
+                })
+    return regressions
+
+
+def load(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def save(path, run):
+    with open(path, "w") as file:
+        json.dump(run, file, indent=1, sort_keys=True)
+        file.write("\n")
+
+
+def format_results(results):
+    lines = [f"{'benchmark':<48} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KiB':>9}"]
+    for name, stats in results.items():
+        lines.append(
+            f"{name:<48} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} "
+            f"{stats['p99_ms']:>9.3f} {stats['peak_kib']:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def format_regressions(regressions):
+    if not regressions:
+        return "No regressions"
+    return "\n".join(
+        f"REGRESSION {r['name']} {r['stat']}: {r['baseline']:.3f} -> {r['current']:.3f} ({r['ratio']:.2f}x)"
+        for r in regressions
+    )
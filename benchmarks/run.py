@@ -0,0 +1,265 @@
+"""
+Benchmark the dashboard's queries, components, reports and routes.
+
+Runs against a generated database of the requested size, created with
+src/generate_data.py on first use and kept in benchmarks/data/, or
+against an existing database passed with --db. Results are written as
+JSON with p50/p95/p99 times and memory peaks per benchmark. With
+--baseline, results are compared against a stored run and the exit
+status is 1 if any benchmark regressed.
+
+    python benchmarks/run.py --employees 2000 --teams 100 --output latest.json
+    python benchmarks/run.py --baseline baseline.json --filter '^query\\.'
+"""
+import argparse
+import contextlib
+import io
+import os
+import platform
+import re
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from harness import Benchmark, compare, format_regressions, format_results, load, measure, save
+
+project_root = Path(__file__).resolve().parent.parent
+data_dir = Path(__file__).resolve().parent / "data"
+
+# A fixed last day keeps generated databases, and so results,
+# comparable between runs on different days
+END_DATE = "2024-12-31"
+
+
+def generated_db(employees, teams, days, seed):
+    """
+    Return the path of a generated database, generating it if needed.
+    """
+    path = data_dir / f"employees{employees}-teams{teams}-days{days}-seed{seed}.db"
+    if not path.exists():
+        data_dir.mkdir(parents=True, exist_ok=True)
+        subprocess.run(
+            [
+                sys.executable, "generate_data.py", str(path),
+                "--employees", str(employees), "--teams", str(teams),
+                "--days", str(days), "--seed", str(seed), "--end", END_DATE,
+            ],
+            cwd=project_root / "src",
+            check=True,
+        )
+    return path
+
+
+def load_dashboard(db, backend):
+    """
+    Point the models at `db` and import the dashboard app.
+    """
+    from employee_events.sql_execution import configure_pool
+
+    configure_pool(db_path=db)
+    os.environ["REPORT_BACKEND"] = backend
+    os.environ.pop("REPORT_CACHE_DIR", None)
+    sys.path.insert(0, str(project_root / "report"))
+    import dashboard
+
+    return dashboard
+
+
+def sample_ids(model, count, rng):
+    ids = [str(id) for _, id in model.names()]
+    return [ids[i] for i in rng.choice(len(ids), size=min(count, len(ids)), replace=False)]
+
+
+def entity_benchmarks(dashboard, entity, model, id_of, get, clear_caches):
+    """
+    Build the benchmarks of one entity type.
+    """
+    queries = {
+        "names": lambda i: model.names(),
+        "username": lambda i: model.username(id_of(i)),
+        "search_names": lambda i: model.search_names("ar", 20),
+        "data_version": lambda i: model.data_version(),
+        "entity_version": lambda i: model.entity_version(id_of(i)),
+        "event_counts": lambda i: model.event_counts(id_of(i)),
+        "cumulative_event_counts": lambda i: model.cumulative_event_counts(id_of(i)),
+        "model_data": lambda i: model.model_data(id_of(i)),
+        "notes": lambda i: model.notes(id_of(i)),
+        "notes_page": lambda i: model.notes_page(id_of(i), None, 25),
+        "sorted_notes": lambda i: model.sorted_notes(id_of(i), "note", False, 25, 0),
+        "report_bundle": lambda i: model.report_bundle(id_of(i)),
+    }
+    if hasattr(model, "all_model_data"):
+        queries["all_model_data"] = lambda i: model.all_model_data()
+    cases = [Benchmark(f"query.{entity}.{name}", func) for name, func in queries.items()]
+
+    components = {
+        "LineChart": dashboard.Visualizations.children[0],
+        "BarChart": dashboard.Visualizations.children[1],
+        "NotesTable": dashboard.Report.notes_table,
+        "ReportDropdown": dashboard.DashboardFilters.children[1],
+    }
+    for name, component in components.items():
+        cases.append(Benchmark(
+            f"component.{name}.{entity}",
+            lambda i, component=component: component.build_component(id_of(i), model),
+            clear_caches,
+        ))
+    for chart in dashboard.Visualizations.children:
+        cases.append(Benchmark(
+            f"chart.{chart.kind}.{entity}",
+            lambda i, chart=chart: chart.render(id_of(i), model),
+        ))
+
+    return cases + [
+        Benchmark(f"report.{entity}", lambda i: dashboard.report(id_of(i), model), clear_caches),
+        Benchmark(f"report.bundled.{entity}", lambda i: dashboard.render_report(id_of(i), model), clear_caches),
+        Benchmark(f"http.{entity}.page", lambda i: get(f"/{entity}/{id_of(i)}"), clear_caches),
+        # The warm-up calls cache the page
+        Benchmark(f"http.{entity}.page.cached", lambda i: get(f"/{entity}/{id_of(0)}")),
+        Benchmark(f"http.{entity}.chart.line", lambda i: get(f"/chart/line/{entity}/{id_of(i)}"), clear_caches),
+        Benchmark(f"http.{entity}.notes", lambda i: get(f"/notes/{entity}/{id_of(i)}?sort=note")),
+        Benchmark(f"http.{entity}.search", lambda i: get(f"/search/{entity}?q=ar")),
+    ]
+
+
+def benchmarks(dashboard, ids):
+    """
+    Build every benchmark of the suite.
+
+    Each benchmark cycles through the sampled ids of its entity type.
+    Component, chart and page benchmarks clear the caches in front of
+    them first, so they time a render rather than a cache lookup;
+    the "cached" page benchmarks time the cache hit.
+    """
+    from starlette.testclient import TestClient
+    from base_components import MatplotlibViz
+
+    def clear_caches():
+        dashboard.page_cache.clear()
+        dashboard.ReportDropdown.cache.clear()
+        MatplotlibViz.cache.clear()
+
+    client = TestClient(dashboard.app)
+
+    def get(url):
+        response = client.get(url)
+        response.raise_for_status()
+        return response
+
+    cases = []
+    for entity, model_class in dashboard.models.items():
+        entity_ids = ids[entity]
+        cases += entity_benchmarks(
+            dashboard, entity, model_class(),
+            lambda i, entity_ids=entity_ids: entity_ids[i % len(entity_ids)],
+            get, clear_caches,
+        )
+
+    return cases + [
+        Benchmark("risk.score_all", lambda i: dashboard.BarChart.scorer.score_all()),
+        Benchmark(
+            "http.update_dropdown",
+            lambda i: get(f"/update_dropdown?profile_type={('Employee', 'Team')[i % 2]}"),
+            clear_caches,
+        ),
+    ]
+
+
+def database_rows(db):
+    with sqlite3.connect(f"{Path(db).absolute().as_uri()}?mode=ro", uri=True) as connection:
+        return {
+            table: connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("employee", "team", "employee_events", "notes")
+        }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=project_root, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(db, backend="sqlite", repeat=50, warmup=3, pattern=None, ids_per_entity=20, seed=0, out=sys.stderr):
+    """
+    Run the suite against a database.
+
+    Returns
+    -------
+    dict
+        The run's "meta" data (environment, database and settings) and
+        its "results", the statistics of each benchmark by name
+    """
+    dashboard = load_dashboard(db, backend)
+    rng = np.random.default_rng(seed)
+    ids = {entity: sample_ids(model(), ids_per_entity, rng) for entity, model in dashboard.models.items()}
+
+    cases = benchmarks(dashboard, ids)
+    if pattern:
+        cases = [case for case in cases if re.search(pattern, case.name)]
+
+    results = {}
+    for case in cases:
+        # Routes print to stdout; keep it for the results
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[case.name] = measure(case, repeat, warmup)
+        stats = results[case.name]
+        print(f"{case.name}: p50 {stats['p50_ms']:.3f} ms, p95 {stats['p95_ms']:.3f} ms", file=out)
+
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "database": str(db),
+            "rows": database_rows(db),
+            "backend": backend,
+            "renderer": dashboard.MatplotlibViz.renderer,
+            "repeat": repeat,
+            "warmup": warmup,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's queries, components and routes.")
+    parser.add_argument("--db", type=Path, help="an existing database to benchmark instead of a generated one")
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--teams", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=0, help="seeds the generated database and the sampled ids")
+    parser.add_argument("--backend", choices=["sqlite", "snapshot"], default="sqlite")
+    parser.add_argument("--repeat", type=int, default=50, help="timed calls per benchmark")
+    parser.add_argument("--warmup", type=int, default=3, help="untimed calls per benchmark")
+    parser.add_argument("--filter", help="only run benchmarks whose name matches this regular expression")
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, help="flag regressions against this stored run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="tolerated relative slowdown (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    db = args.db or generated_db(args.employees, args.teams, args.days, args.seed)
+    result = run(db, args.backend, args.repeat, args.warmup, args.filter, seed=args.seed)
+
+    print(format_results(result["results"]))
+    if args.output:
+        save(args.output, result)
+
+    if args.baseline:
+        regressions = compare(result["results"], load(args.baseline)["results"], args.threshold)
+        print(format_regressions(regressions))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Measure the cold start of a dashboard worker.
+
+Starts fresh interpreters that import the dashboard, timing the whole
+process and the import itself, and summarizes `python -X importtime`
+of one more start to show which modules the time goes to. Heavy optional modules that
+the import loaded are listed, since they should only load on first
+use. Results are written in the format of benchmarks/run.py, so
+benchmarks/compare.py can compare them against a baseline.
+
+    python benchmarks/startup.py --runs 10 --budget-ms 300
+    python benchmarks/startup.py --block IPython --output startup.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from harness import save, summarize
+
+project_root = Path(__file__).resolve().parent.parent
+
+# Modules the dashboard should not need until a request uses them
+HEAVY_MODULES = ("pandas", "numpy", "matplotlib", "sklearn", "scipy", "IPython")
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+for name in {blocked!r}:
+    sys.modules[name] = None
+sys.path.insert(0, {report!r})
+import dashboard
+imported = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "loaded": [name for name in {heavy!r} if sys.modules.get(name) is not None],
+}}))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Read the per-module times of a `-X importtime` report.
+
+    Returns
+    -------
+    list of tuple
+        (module, depth, self ms, cumulative ms), in import order
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append((name.strip(), depth, int(self_us) / 1000, int(cumulative_us) / 1000))
+    return modules
+
+
+def start_worker(blocked=(), importtime=False):
+    """
+    Import the dashboard in a fresh interpreter.
+
+    Runs in an empty working directory, as a new worker would, so the
+    session key file is created too. `-X importtime` slows imports
+    down, so starts that report it should not be timed.
+
+    Returns
+    -------
+    dict
+        The process and import times in milliseconds, the heavy
+        modules loaded and, with `importtime`, the parsed report
+    """
+    code = CHILD.format(blocked=tuple(blocked), report=str(project_root / "report"), heavy=HEAVY_MODULES)
+    options = ["-X", "importtime"] if importtime else []
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        child = subprocess.run(
+            [sys.executable, *options, "-c", code],
+            cwd=directory, capture_output=True, text=True, check=True,
+        )
+        process_ms = (time.perf_counter() - started) * 1000
+
+    report = json.loads(child.stdout.strip().splitlines()[-1])
+    return {
+        "process_ms": process_ms,
+        "import_ms": report["import_ms"],
+        "loaded": report["loaded"],
+        "modules": parse_importtime(child.stderr) if importtime else [],
+    }
+
+
+def slowest(modules, top=15):
+    """
+    Rank the modules of an importtime report.
+
+    Returns
+    -------
+    dict
+        The `top` modules by self time, and the dashboard's direct
+        imports by cumulative time, each as (module, ms) pairs
+    """
+    def ranked(times):
+        return sorted(times, key=lambda item: item[1], reverse=True)[:top]
+
+    return {
+        "self": ranked((name, own) for name, _, own, _ in modules),
+        "direct_imports": ranked((name, cumulative) for name, depth, _, cumulative in modules if depth == 1),
+    }
+
+
+def measure_startup(runs=5, blocked=()):
+    """
+    Start `runs` workers and summarize their start-up times.
+
+    Returns
+    -------
+    dict
+        A benchmark run with "startup.process" and "startup.import"
+        results, plus the slowest modules and the heavy modules loaded
+    """
+    # The untimed, importtime start also fills the OS file cache and
+    # the bytecode caches
+    breakdown = start_worker(blocked, importtime=True)
+    workers = [start_worker(blocked) for _ in range(runs)]
+
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "blocked": list(blocked),
+            "runs": runs,
+        },
+        "results": {
+            "startup.process": summarize([worker["process_ms"] / 1000 for worker in workers]),
+            "startup.import": summarize([worker["import_ms"] / 1000 for worker in workers]),
+        },
+        "heavy_modules_loaded": sorted({name for worker in workers for name in worker["loaded"]}),
+        "slowest_modules": slowest(breakdown["modules"]),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the cold start of a dashboard worker.")
+    parser.add_argument("--runs", type=int, default=5, help="workers to start (default: 5)")
+    parser.add_argument(
+        "--block", action="append", default=[],
+        help="make an installed optional module unimportable, as in an environment without it",
+    )
+    parser.add_argument("--budget-ms", type=float, help="exit with status 1 if the median start takes longer")
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    result = measure_startup(args.runs, args.block)
+    process, imported = result["results"]["startup.process"], result["results"]["startup.import"]
+    print(f"Worker start: p50 {process['p50_ms']:.0f} ms (import {imported['p50_ms']:.0f} ms), "
+          f"max {process['max_ms']:.0f} ms")
+    print("Heavy modules loaded:", ", ".join(result["heavy_modules_loaded"]) or "none")
+    print("Slowest direct imports of the dashboard, under -X importtime:")
+    for name, ms in result["slowest_modules"]["direct_imports"]:
+        print(f"  {name:<40} {ms:>8.1f} ms")
+
+    if args.output:
+        save(args.output, result)
+
+    if args.budget_ms is not None and process["p50_ms"] > args.budget_ms:
+        print(f"Over the {args.budget_ms:.0f} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
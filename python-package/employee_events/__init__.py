@@ -1,4 +1,20 @@
 from .employee import Employee
 from .team import Team
 from .query_base import QueryBase
-from .sql_execution import *
\ No newline at end of file
+from .bundle import ReportBundle, BundledModel
+from .sql_execution import *
+from .pool import ConnectionPool, PoolClosedError, PoolTimeoutError
+from .queries import QUERIES, statement
+from .async_query import AsyncQueryBase, AsyncEmployee, AsyncTeam
+from . import tracing
+
+# The snapshot backend needs NumPy and pandas at import time,
+# so it is only imported when one of its names is first used
+_SNAPSHOT_NAMES = {"Snapshot", "SnapshotMixin", "SnapshotEmployee", "SnapshotTeam"}
+
+
+def __getattr__(name):
+    if name in _SNAPSHOT_NAMES:
+        from . import snapshot
+        return getattr(snapshot, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
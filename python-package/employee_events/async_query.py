@@ -0,0 +1,118 @@
+import asyncio
+import contextvars
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from .employee import Employee
+from .query_base import QueryBase
+from .sql_execution import pool
+from .team import Team
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Return the executor that runs blocking queries for the async API.
+
+    The executor is created on first use with one worker per pooled
+    connection, so queued queries wait for a worker rather than for
+    a connection, and never block the event loop.
+
+    Returns:
+        concurrent.futures.ThreadPoolExecutor: The shared executor
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=pool.size,
+                thread_name_prefix="employee-events-query",
+            )
+        return _executor
+
+
+def shutdown_executor(wait=True):
+    """
+    Stop the shared executor. A new one is created on the next query.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
+
+
+def _async_generator(name, method):
+
+    # Advance the blocking generator one item at a time on the executor
+    @wraps(method)
+    async def iterate_in_executor(self, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        iterator = getattr(self.sync, name)(*args, **kwargs)
+        done = object()
+        try:
+            while True:
+                # Run in a copy of the caller's context, so tracing
+                # spans nest under the caller's
+                item = await loop.run_in_executor(
+                    get_executor(), contextvars.copy_context().run, next, iterator, done
+                )
+                if item is done:
+                    return
+                yield item
+        finally:
+            iterator.close()
+
+    return iterate_in_executor
+
+
+def _async_method(name, method):
+
+    if inspect.isgeneratorfunction(method):
+        return _async_generator(name, method)
+
+    @wraps(method)
+    async def run_in_executor(self, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        call = partial(getattr(self.sync, name), *args, **kwargs)
+        return await loop.run_in_executor(get_executor(), contextvars.copy_context().run, call)
+
+    return run_in_executor
+
+
+class AsyncQueryBase:
+    """
+    Awaitable counterpart of a `QueryBase` subclass.
+
+    Every public method of `sync_class` is exposed as a coroutine with
+    the same name and arguments, and every generator method as an
+    async generator. The blocking call runs on a dedicated,
+    bounded thread pool, so awaiting it never stalls the event loop.
+    """
+
+    sync_class = QueryBase
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name, method in inspect.getmembers(cls.sync_class, inspect.isfunction):
+            if not name.startswith("_") and name not in vars(cls):
+                setattr(cls, name, _async_method(name, method))
+
+    def __init__(self):
+        self.sync = self.sync_class()
+
+    @property
+    def name(self):
+        return self.sync.name
+
+
+class AsyncEmployee(AsyncQueryBase):
+    sync_class = Employee
+
+
+class AsyncTeam(AsyncQueryBase):
+    sync_class = Team
@@ -0,0 +1,88 @@
+from typing import TYPE_CHECKING, List, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+EVENT_COLUMNS = ["event_date", "positive_events", "negative_events"]
+
+
+class ReportBundle(NamedTuple):
+    """
+    Everything a report reads about one employee or team, fetched
+    from a single snapshot of the database by `report_bundle`.
+    """
+
+    id: str
+    version: str
+    entity_version: str
+    names: List[Tuple[str, int]]
+    username: Optional[str]
+    # Daily and cumulative totals, read with one scan of the rollup
+    events: "pd.DataFrame"
+    notes: "pd.DataFrame"
+    notes_cursor: Optional[str]
+    notes_limit: int
+
+
+class BundledModel:
+    """
+    A model that answers a report's queries from a `ReportBundle`.
+
+    Queries about the bundled id are served from memory without
+    touching the database; any other call is passed on to the
+    wrapped model. Components render a `BundledModel` exactly like
+    the `Employee` or `Team` it wraps.
+    """
+
+    def __init__(self, model, bundle):
+        self.model = model
+        self.bundle = bundle
+
+    @property
+    def name(self):
+        return self.model.name
+
+    def __getattr__(self, attr):
+        return getattr(self.model, attr)
+
+    def _bundled(self, id):
+        return str(id) == self.bundle.id
+
+    def names(self):
+        return list(self.bundle.names)
+
+    def data_version(self):
+        return self.bundle.version
+
+    def entity_version(self, id):
+        if not self._bundled(id):
+            return self.model.entity_version(id)
+        return self.bundle.entity_version
+
+    def username(self, id):
+        if not self._bundled(id):
+            return self.model.username(id)
+        return [] if self.bundle.username is None else [(self.bundle.username,)]
+
+    def event_counts(self, id):
+        if not self._bundled(id):
+            return self.model.event_counts(id)
+        return self.bundle.events[EVENT_COLUMNS].copy()
+
+    def cumulative_event_counts(self, id):
+        if not self._bundled(id):
+            return self.model.cumulative_event_counts(id)
+        import pandas as pd
+
+        events = self.bundle.events
+        return pd.DataFrame({
+            "event_date": events["event_date"],
+            "positive_events": events["cumulative_positive"],
+            "negative_events": events["cumulative_negative"],
+        })
+
+    def notes_page(self, id, cursor=None, limit=25, descending=False):
+        if not (self._bundled(id) and cursor is None and not descending
+                and limit == self.bundle.notes_limit):
+            return self.model.notes_page(id, cursor, limit, descending)
+        return self.bundle.notes.copy(), self.bundle.notes_cursor
@@ -19,11 +19,7 @@ class Employee(QueryBase):
             the full name and ID of an employee.
         """
 
-        sql_query = """
-                       SELECT first_name || ' ' || last_name AS full_name, employee_id
-                       FROM employee
-                """
-        return self.query(sql_query)
+        return self.query(self.statement("names"))
 
 
     def username(self, id):
@@ -40,12 +36,7 @@ class Employee(QueryBase):
             List[Tuple[str]]: A list of tuples, each containing
             the full name of the employee as a string.
         """
-        sql_query = f"""
-                    SELECT first_name || ' ' || last_name AS full_name
-                    FROM employee
-                    WHERE employee_id = {id}
-                """
-        return self.query(sql_query)
+        return self.query(self.statement("username"), (id,))
     
     def model_data(self, id):
 
@@ -63,12 +54,19 @@ class Employee(QueryBase):
             pandas.DataFrame: A dataframe containing the count of positive
             and negative events for the employee as a pandas Series.
         """
-        sql_query = f"""
-               SELECT SUM(positive_events) AS positive_events,
-                      SUM(negative_events) AS negative_events
-               FROM {self.name}
-               JOIN employee_events USING({self.name}_id)
-               WHERE {self.name}.{self.name}_id = {id}
-           """
-
-        return self.pandas_query(sql_query)
\ No newline at end of file
+        return self.pandas_query(self.statement("model_data"), (id,))
+
+    def all_model_data(self):
+        """
+        Retrieve the model data of every employee in one query.
+
+        Executes an SQL query that sums the positive and negative
+        events of every employee per team they logged events for,
+        so both employee totals and team averages can be derived
+        from a single scan of the events table.
+
+        Returns:
+            pandas.DataFrame: A dataframe with `employee_id`, `team_id`,
+            `positive_events` and `negative_events` columns.
+        """
+        return self.pandas_query(self.statement("all_model_data"))
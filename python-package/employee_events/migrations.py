@@ -0,0 +1,184 @@
+"""
+Versioned schema migrations for employee_events.db.
+
+The schema version is stored in the database's `user_version` pragma.
+Each migration runs in its own transaction and bumps the version when
+it commits, so running the tool again only applies what is missing.
+
+Usage:
+    python -m employee_events.migrations [--db PATH] [--target VERSION]
+"""
+import argparse
+import sqlite3
+from pathlib import Path
+
+from .sql_execution import db_path
+
+
+MIGRATIONS = [
+    (
+        1,
+        "Primary keys on employee and team, covering indexes for report queries",
+        (
+            """
+            CREATE TABLE employee_migrated (
+                employee_id INTEGER PRIMARY KEY,
+                first_name TEXT,
+                last_name TEXT,
+                team_id INTEGER
+            )
+            """,
+            """
+            INSERT INTO employee_migrated (employee_id, first_name, last_name, team_id)
+            SELECT employee_id, first_name, last_name, team_id
+            FROM employee
+            """,
+            "DROP TABLE employee",
+            "ALTER TABLE employee_migrated RENAME TO employee",
+            """
+            CREATE TABLE team_migrated (
+                team_id INTEGER PRIMARY KEY,
+                team_name TEXT,
+                shift TEXT,
+                manager_name TEXT
+            )
+            """,
+            """
+            INSERT INTO team_migrated (team_id, team_name, shift, manager_name)
+            SELECT team_id, team_name, shift, manager_name
+            FROM team
+            """,
+            "DROP TABLE team",
+            "ALTER TABLE team_migrated RENAME TO team",
+            """
+            CREATE INDEX IF NOT EXISTS ix_employee_events_employee_date
+            ON employee_events (employee_id, event_date, positive_events, negative_events)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_employee_events_team_employee
+            ON employee_events (team_id, employee_id)
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_notes_employee ON notes (employee_id)",
+            "CREATE INDEX IF NOT EXISTS ix_notes_team ON notes (team_id)",
+        ),
+    ),
+    (
+        2,
+        "Daily event rollups per employee and team (filled by employee_events.rollups)",
+        (
+            """
+            CREATE TABLE event_rollup (
+                entity_type TEXT NOT NULL,
+                entity_id INTEGER NOT NULL,
+                event_date TEXT NOT NULL,
+                positive_events INTEGER NOT NULL,
+                negative_events INTEGER NOT NULL,
+                cumulative_positive INTEGER NOT NULL DEFAULT 0,
+                cumulative_negative INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (entity_type, entity_id, event_date)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE rollup_watermark (
+                name TEXT PRIMARY KEY,
+                last_rowid INTEGER NOT NULL
+            )
+            """,
+        ),
+    ),
+    (
+        3,
+        "Index notes by entity and date for keyset pagination",
+        (
+            "DROP INDEX IF EXISTS ix_notes_employee",
+            "DROP INDEX IF EXISTS ix_notes_team",
+            "CREATE INDEX ix_notes_employee_date ON notes (employee_id, note_date)",
+            "CREATE INDEX ix_notes_team_date ON notes (team_id, note_date)",
+        ),
+    ),
+]
+
+
+def current_version(connection):
+    """
+    Read the schema version of a database.
+
+    Args:
+        connection (sqlite3.Connection): An open database connection.
+
+    Returns:
+        int: The version of the last applied migration, 0 if none.
+    """
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(path=db_path, target=None):
+    """
+    Apply every pending migration to a database, then run ANALYZE.
+
+    Args:
+        path (str or Path): The database file to migrate.
+        target (int): Stop after this version. Defaults to the latest.
+
+    Returns:
+        List[int]: The versions applied by this call.
+    """
+    path = Path(path)
+    if not path.is_file():
+        raise FileNotFoundError(f"Database does not exist: {path}")
+
+    latest = MIGRATIONS[-1][0]
+    target = latest if target is None else target
+    if not 0 <= target <= latest:
+        raise ValueError(f"Target version must be between 0 and {latest}")
+
+    applied = []
+    connection = sqlite3.connect(path, isolation_level=None)
+    try:
+        version = current_version(connection)
+        for number, _, statements in MIGRATIONS:
+            if number <= version or number > target:
+                continue
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                for sql in statements:
+                    connection.execute(sql)
+                connection.execute(f"PRAGMA user_version = {number}")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+            applied.append(number)
+
+        connection.execute("ANALYZE")
+    finally:
+        connection.close()
+
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=db_path, type=Path, help="database to migrate")
+    parser.add_argument("--target", type=int, help="version to migrate to")
+    parser.add_argument("--status", action="store_true", help="print the current version and exit")
+    args = parser.parse_args(argv)
+
+    if args.status:
+        connection = sqlite3.connect(args.db)
+        version = current_version(connection)
+        connection.close()
+        for number, description, _ in MIGRATIONS:
+            state = "applied" if number <= version else "pending"
+            print(f"{number:>4}  {state:<8} {description}")
+        return
+
+    applied = migrate(args.db, args.target)
+    if applied:
+        print(f"Applied migrations: {', '.join(map(str, applied))}")
+    else:
+        print("Database is up to date")
+
+
+if __name__ == "__main__":
+    main()
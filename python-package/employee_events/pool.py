@@ -0,0 +1,242 @@
+import atexit
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class PoolClosedError(RuntimeError):
+    """Raised when a connection is requested from a closed pool."""
+
+
+class PoolTimeoutError(RuntimeError):
+    """Raised when no connection became available within the timeout."""
+
+
+class ConnectionPool:
+    """
+    A bounded pool of reusable SQLite connections.
+
+    A connection is checked out by one thread at a time and is handed
+    back to the pool when the thread is done with it, so the cost of
+    opening the database file and applying pragmas is only paid when
+    the pool grows. Nested checkouts from the same thread reuse the
+    connection the thread already holds.
+
+    Args:
+        db_path (str or Path): Path to the SQLite database file.
+        size (int): Maximum number of open connections.
+        timeout (float): Seconds to wait for a free connection before
+            raising `PoolTimeoutError`.
+        read_only (bool): Open connections with `mode=ro`.
+        immutable (bool): Open connections with `immutable=1`. Only use
+            this when nothing writes to the database while it is served.
+        journal_mode (str): Optional `journal_mode` pragma, e.g. "wal".
+        mmap_size (int): Optional `mmap_size` pragma in bytes.
+        health_check_interval (float): Seconds a connection may sit idle
+            before it is validated with `SELECT 1` on checkout.
+        cached_statements (int): Size of each connection's prepared
+            statement cache.
+    """
+
+    def __init__(
+        self,
+        db_path,
+        size=8,
+        timeout=30.0,
+        read_only=False,
+        immutable=False,
+        journal_mode=None,
+        mmap_size=None,
+        health_check_interval=30.0,
+        cached_statements=128,
+    ):
+        self.db_path = Path(db_path)
+        self.size = size
+        self.timeout = timeout
+        self.read_only = read_only
+        self.immutable = immutable
+        self.journal_mode = journal_mode
+        self.mmap_size = mmap_size
+        self.health_check_interval = health_check_interval
+        self.cached_statements = cached_statements
+
+        self._idle = []
+        self._open = 0
+        # Bumped by `reset`; connections opened before are not reused
+        self._generation = 0
+        self._closed = False
+        self._lock = threading.Condition()
+        self._local = threading.local()
+
+    def uri(self):
+        """
+        Build the `file:` URI used to open connections.
+
+        Returns:
+            str: The database URI including the read-only and
+            immutable flags when they are enabled.
+        """
+        params = []
+        if self.read_only:
+            params.append("mode=ro")
+        if self.immutable:
+            params.append("immutable=1")
+        uri = self.db_path.absolute().as_uri()
+        if params:
+            uri += "?" + "&".join(params)
+        return uri
+
+    def _connect(self):
+        connection = sqlite3.connect(
+            self.uri(),
+            uri=True,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        if self.journal_mode and not (self.read_only or self.immutable):
+            connection.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        if self.mmap_size is not None:
+            connection.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        return connection
+
+    def _healthy(self, connection):
+        try:
+            connection.execute("SELECT 1").fetchone()
+        except sqlite3.Error:
+            return False
+        return True
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.timeout
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise PoolClosedError(f"Connection pool for {self.db_path} is closed")
+                generation = self._generation
+                if self._idle:
+                    connection, released_at = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    connection = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"No connection available after {self.timeout}s (size={self.size})"
+                    )
+                self._lock.wait(remaining)
+
+        if connection is not None:
+            idle_for = time.monotonic() - released_at
+            if idle_for < self.health_check_interval or self._healthy(connection):
+                return connection, generation
+            connection.close()
+
+        try:
+            return self._connect(), generation
+        except Exception:
+            with self._lock:
+                self._open -= 1
+                self._lock.notify()
+            raise
+
+    def _release(self, connection, generation):
+        if connection.in_transaction:
+            connection.rollback()
+        with self._lock:
+            # Opened with the settings from before a reset
+            if self._closed or generation != self._generation:
+                self._open -= 1
+                connection.close()
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._lock.notify()
+
+    def _discard(self, connection):
+        connection.close()
+        with self._lock:
+            self._open -= 1
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection for the duration of a `with` block.
+
+        Yields:
+            sqlite3.Connection: A connection owned by the calling thread
+            until the block exits.
+        """
+        held = getattr(self._local, "connection", None)
+        if held is not None:
+            yield held
+            return
+
+        connection, generation = self._acquire()
+        self._local.connection = connection
+        try:
+            yield connection
+        except BaseException:
+            self._local.connection = None
+            if self._healthy(connection):
+                self._release(connection, generation)
+            else:
+                self._discard(connection)
+            raise
+        self._local.connection = None
+        self._release(connection, generation)
+
+    def close(self):
+        """
+        Close every idle connection and refuse further checkouts.
+
+        Connections that are checked out when the pool is closed are
+        closed as soon as they are released.
+        """
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                connection, _ = self._idle.pop()
+                connection.close()
+                self._open -= 1
+            self._lock.notify_all()
+
+    def reset(self):
+        """
+        Close the idle connections and reopen the pool.
+
+        Useful after changing the pool settings or replacing the
+        database file, so new checkouts pick up the changes.
+        Connections checked out during the reset are closed when
+        they are released instead of being reused.
+        """
+        self.close()
+        with self._lock:
+            self._generation += 1
+            self._closed = False
+
+    def stats(self):
+        """
+        Report the current pool occupancy.
+
+        Returns:
+            dict: The number of open, idle and checked out connections
+            and the configured size.
+        """
+        with self._lock:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+            }
+
+    def register_shutdown(self):
+        """
+        Close the pool when the interpreter exits.
+        """
+        atexit.register(self.close)
+        return self
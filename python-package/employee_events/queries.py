@@ -0,0 +1,191 @@
+"""
+Registry of the named, parameterized SQL statements used by the package.
+
+Statements are keyed by "<entity>.<query>" and bind their arguments with
+`?` placeholders, so each statement text is parsed and planned once per
+connection and then served from the connection's statement cache.
+"""
+
+ENTITIES = ("employee", "team")
+
+# Statements shared by every entity, formatted with the entity name
+SHARED = {
+    "event_counts": """
+        SELECT event_date, positive_events, negative_events
+        FROM event_rollup
+        WHERE entity_type = '{name}' AND entity_id = ?
+        ORDER BY event_date
+        """,
+    "cumulative_event_counts": """
+        SELECT event_date,
+               cumulative_positive AS positive_events,
+               cumulative_negative AS negative_events
+        FROM event_rollup
+        WHERE entity_type = '{name}' AND entity_id = ?
+        ORDER BY event_date
+        """,
+    "report_events": """
+        SELECT event_date,
+               positive_events,
+               negative_events,
+               cumulative_positive,
+               cumulative_negative
+        FROM event_rollup
+        WHERE entity_type = '{name}' AND entity_id = ?
+        ORDER BY event_date
+        """,
+    "data_version": """
+        SELECT (SELECT MAX(rowid) FROM employee_events),
+               (SELECT last_rowid FROM rollup_watermark WHERE name = 'employee_events'),
+               (SELECT MAX(rowid) FROM notes),
+               (SELECT MAX(rowid) FROM employee),
+               (SELECT MAX(rowid) FROM team)
+        """,
+    "entity_version": """
+        SELECT (SELECT MAX(rowid) FROM employee_events WHERE {name}_id = ?1),
+               (SELECT MAX(rowid) FROM employee_events
+                WHERE {name}_id = ?1
+                AND +rowid <= (SELECT last_rowid FROM rollup_watermark WHERE name = 'employee_events')),
+               (SELECT MAX(rowid) FROM notes WHERE {name}_id = ?1),
+               (SELECT MAX(rowid) FROM employee),
+               (SELECT MAX(rowid) FROM team)
+        """,
+    "notes": """
+        SELECT note_date, note
+        FROM notes
+        JOIN {name} USING({name}_id)
+        WHERE {name}.{name}_id = ?
+        """,
+}
+
+QUERIES = {
+    "employee.names": """
+        SELECT first_name || ' ' || last_name AS full_name, employee_id
+        FROM employee
+        """,
+    "employee.username": """
+        SELECT first_name || ' ' || last_name AS full_name
+        FROM employee
+        WHERE employee_id = ?
+        """,
+    "employee.search_names": """
+        SELECT first_name || ' ' || last_name AS full_name, employee_id
+        FROM employee
+        WHERE first_name || ' ' || last_name LIKE ? ESCAPE '\\'
+        LIMIT ?
+        """,
+    "employee.model_data": """
+        SELECT SUM(positive_events) AS positive_events,
+               SUM(negative_events) AS negative_events
+        FROM employee
+        JOIN employee_events USING(employee_id)
+        WHERE employee.employee_id = ?
+        """,
+    "employee.all_model_data": """
+        SELECT employee_id,
+               team_id,
+               SUM(positive_events) AS positive_events,
+               SUM(negative_events) AS negative_events
+        FROM employee_events
+        GROUP BY employee_id, team_id
+        """,
+    "team.names": """
+        SELECT team_name, team_id
+        FROM team
+        """,
+    "team.search_names": """
+        SELECT team_name, team_id
+        FROM team
+        WHERE team_name LIKE ? ESCAPE '\\'
+        LIMIT ?
+        """,
+    "team.username": """
+        SELECT team_name
+        FROM team
+        WHERE team_id = ?
+        """,
+    "team.model_data": """
+        SELECT positive_events, negative_events
+        FROM (
+            SELECT employee_id,
+                   SUM(positive_events) AS positive_events,
+                   SUM(negative_events) AS negative_events
+            FROM team
+            JOIN employee_events USING(team_id)
+            WHERE team.team_id = ?
+            GROUP BY employee_id
+        )
+        """,
+}
+
+QUERIES.update(
+    (f"{entity}.{key}", sql.format(name=entity))
+    for entity in ENTITIES
+    for key, sql in SHARED.items()
+)
+
+# Columns notes can be sorted by. ORDER BY cannot be bound as a
+# parameter, so each ordering is registered as its own statement.
+NOTES_ORDER = ("note_date", "note")
+
+SORTED_NOTES = """
+    SELECT note_date, note
+    FROM notes
+    JOIN {name} USING({name}_id)
+    WHERE {name}.{name}_id = ?
+    ORDER BY {column} {direction}, notes.rowid {direction}
+    LIMIT ? OFFSET ?
+    """
+
+# Keyset pagination over (note_date, rowid): each page continues
+# after the last row of the previous one instead of skipping rows
+NOTES_KEYSET = """
+    SELECT note_date, note, notes.rowid
+    FROM notes
+    WHERE {name}_id = ?{after}
+    ORDER BY note_date {direction}, notes.rowid {direction}
+    LIMIT ?
+    """
+
+QUERIES.update(
+    (
+        f"{entity}.notes_keyset.{'after' if after else 'first'}.{direction.lower()}",
+        NOTES_KEYSET.format(
+            name=entity,
+            direction=direction,
+            after=f" AND (note_date, notes.rowid) {'>' if direction == 'ASC' else '<'} (?, ?)" if after else "",
+        ),
+    )
+    for entity in ENTITIES
+    for after in (False, True)
+    for direction in ("ASC", "DESC")
+)
+
+QUERIES.update(
+    (
+        f"{entity}.sorted_notes.{column}.{direction.lower()}",
+        SORTED_NOTES.format(name=entity, column=column, direction=direction),
+    )
+    for entity in ENTITIES
+    for column in NOTES_ORDER
+    for direction in ("ASC", "DESC")
+)
+
+
+def statement(name):
+    """
+    Look up a registered statement by name.
+
+    Args:
+        name (str): The "<entity>.<query>" key of the statement.
+
+    Returns:
+        str: The SQL text with `?` placeholders.
+
+    Raises:
+        KeyError: If no statement is registered under `name`.
+    """
+    try:
+        return QUERIES[name]
+    except KeyError:
+        raise KeyError(f"No query registered as {name!r}") from None
@@ -1,10 +1,37 @@
 
+from . import tracing
+from .bundle import ReportBundle
 from .sql_execution import QueryMixin
+from .queries import statement, NOTES_ORDER
+
+
+def _encode_cursor(note_date, rowid):
+    return f"{note_date}~{rowid}"
+
+
+def _decode_cursor(cursor):
+    note_date, sep, rowid = cursor.rpartition("~")
+    if not sep or not note_date or not rowid.isdigit():
+        raise ValueError(f"Invalid notes cursor {cursor!r}")
+    return note_date, int(rowid)
+
 
 class QueryBase(QueryMixin):
 
     name = ""
 
+    def statement(self, key):
+        """
+        Look up this entity's registered SQL statement.
+
+        Args:
+            key (str): The name of the query, e.g. "notes".
+
+        Returns:
+            str: The parameterized SQL text for this entity.
+        """
+        return statement(f"{self.name}.{key}")
+
     def names(self):
 
         # Return an empty list
@@ -16,15 +43,31 @@ class QueryBase(QueryMixin):
         """
         return []
 
+    def search_names(self, text, limit=20):
+        """
+        Retrieve the names that contain `text`, for type-ahead search.
+
+        Matches case-insensitively (for ASCII letters) with SQL `LIKE`,
+        treating `%` and `_` in `text` as literal characters.
+
+        Args:
+            text (str): The text to look for in the names.
+            limit (int): The maximum number of names to return.
+
+        Returns:
+            List[Tuple[str, int]]: Name and ID pairs, like `names`.
+        """
+        escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return self.query(self.statement("search_names"), (f"%{escaped}%", limit))
+
     def event_counts(self, id):
         """
         Retrieve the count of positive and negative events for a given id.
 
-        Executes an SQL query to select and return the count of positive
-        and negative events for the employee or team with an ID equal to the
-        `id` argument. The query groups the results by `event_date` and sums
-        the count of positive and negative events. The results are ordered by
-        `event_date`.
+        Reads the daily totals for the employee or team with an ID equal
+        to the `id` argument from the `event_rollup` table, which holds
+        the sum of positive and negative events per `event_date`. The
+        results are ordered by `event_date`.
 
         Args:
             id (int): The ID of the employee or team.
@@ -33,18 +76,58 @@ class QueryBase(QueryMixin):
             pandas.DataFrame: A dataframe containing the count of positive
             and negative events for the employee or team as a pandas Series.
         """
-        sql_query = f"""
-                    SELECT event_date,
-                           SUM(positive_events) AS positive_events,
-                           SUM(negative_events) AS negative_events
-                    FROM {self.name}
-                    JOIN employee_events USING({self.name}_id)
-                    WHERE {self.name}.{self.name}_id = {id}
-                    GROUP BY event_date
-                    ORDER BY event_date
-                    """
-        return self.pandas_query(sql_query)
+        return self.pandas_query(self.statement("event_counts"), (id,))
+
+    def cumulative_event_counts(self, id):
+        """
+        Retrieve the running totals of positive and negative events.
 
+        Same shape as `event_counts`, but each row holds the totals
+        from the first `event_date` up to and including that date, as
+        precomputed in the `event_rollup` table.
+
+        Args:
+            id (int): The ID of the employee or team.
+
+        Returns:
+            pandas.DataFrame: A dataframe containing the cumulative count
+            of positive and negative events per `event_date`.
+        """
+        return self.pandas_query(self.statement("cumulative_event_counts"), (id,))
+
+
+    def data_version(self):
+        """
+        Retrieve a token that changes whenever the report data changes.
+
+        The token combines the highest rowid of every table with the
+        rollup watermark. Each part is a single index lookup, so the
+        check is cheap enough to run on every request. Rows are treated
+        as append-only: editing a row in place does not change the token.
+
+        Returns:
+            str: An opaque version token for the whole database.
+        """
+        row = self.query(self.statement("data_version"))[0]
+        return "-".join("0" if value is None else str(value) for value in row)
+
+    def entity_version(self, id):
+        """
+        Retrieve a token that changes whenever one entity's report changes.
+
+        Like `data_version`, but only covers the events and notes of the
+        employee or team with an ID equal to the `id` argument, plus the
+        employee and team tables its report lists. Caches keyed by it
+        stay valid while other entities' data changes.
+
+        Args:
+            id (int): The ID of the employee or team.
+
+        Returns:
+            str: An opaque version token for the entity's report.
+        """
+        row = self.query(self.statement("entity_version"), (id,))[0]
+        return "-".join("0" if value is None else str(value) for value in row)
 
     def notes(self, id):
         """
@@ -63,10 +146,145 @@ class QueryBase(QueryMixin):
             pandas.DataFrame: A dataframe containing the note date and content.
         """
 
-        sql_query = f"""
-                    SELECT note_date, note
-                    FROM notes
-                    JOIN {self.name} USING({self.name}_id)
-                    WHERE {self.name}.{self.name}_id = {id}
-                    """
-        return self.pandas_query(sql_query)
\ No newline at end of file
+        return self.pandas_query(self.statement("notes"), (id,))
+
+    def sorted_notes(self, id, sort="note_date", descending=False, limit=None, offset=0):
+        """
+        Retrieve one sorted page of the notes for a given ID.
+
+        Executes the registered statement for the requested ordering,
+        so only `limit` rows are read from the database. Ties are
+        broken by insertion order, which keeps pages stable.
+
+        Args:
+            id (int): The ID of the employee or team.
+            sort (str): The column to sort by, one of `NOTES_ORDER`.
+            descending (bool): Sort from the highest value down.
+            limit (int): The maximum number of notes. None for all.
+            offset (int): The number of sorted notes to skip.
+
+        Returns:
+            pandas.DataFrame: A dataframe containing the note date and content.
+        """
+        if sort not in NOTES_ORDER:
+            raise ValueError(f"Notes cannot be sorted by {sort!r}")
+
+        direction = "desc" if descending else "asc"
+        sql_query = self.statement(f"sorted_notes.{sort}.{direction}")
+        return self.pandas_query(sql_query, (id, -1 if limit is None else limit, offset))
+
+    def _notes_after(self, id, cursor, limit, descending):
+        # Rows of (note_date, note, rowid) following the cursor position
+        direction = "desc" if descending else "asc"
+        if cursor is None:
+            return self.query(self.statement(f"notes_keyset.first.{direction}"), (id, limit))
+        note_date, rowid = _decode_cursor(cursor)
+        return self.query(
+            self.statement(f"notes_keyset.after.{direction}"),
+            (id, note_date, rowid, limit),
+        )
+
+    def notes_page(self, id, cursor=None, limit=25, descending=False):
+        """
+        Retrieve one page of notes ordered by date, using keyset pagination.
+
+        Instead of skipping `offset` rows, each page continues after the
+        `(note_date, rowid)` of the last note on the previous page, so
+        every page is a single index range scan however deep it is.
+
+        Args:
+            id (int): The ID of the employee or team.
+            cursor (str): The cursor returned with the previous page.
+                None for the first page.
+            limit (int): The maximum number of notes on the page.
+            descending (bool): Page from the newest note back.
+
+        Returns:
+            Tuple[pandas.DataFrame, str]: The note date and content of
+            the page, and the cursor of the next page, or None if this
+            is the last page.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        import pandas as pd
+
+        rows = self._notes_after(id, cursor, limit + 1, descending)
+        page = pd.DataFrame([row[:2] for row in rows[:limit]], columns=list(NOTES_ORDER))
+
+        next_cursor = None
+        if len(rows) > limit:
+            note_date, _, rowid = rows[limit - 1]
+            next_cursor = _encode_cursor(note_date, rowid)
+        return page, next_cursor
+
+    def iter_notes(self, id, chunk_size=500, descending=False):
+        """
+        Stream the notes for a given ID, ordered by date, in chunks.
+
+        Reads one keyset page per chunk, so no connection is held
+        between chunks and at most `chunk_size` notes are in memory.
+
+        Args:
+            id (int): The ID of the employee or team.
+            chunk_size (int): The number of notes per chunk.
+            descending (bool): Stream from the newest note back.
+
+        Yields:
+            List[Tuple[str, str]]: The note date and content of up to
+            `chunk_size` notes.
+        """
+        cursor = None
+        while True:
+            rows = self._notes_after(id, cursor, chunk_size, descending)
+            if rows:
+                yield [row[:2] for row in rows]
+            if len(rows) < chunk_size:
+                return
+            note_date, _, rowid = rows[-1]
+            cursor = _encode_cursor(note_date, rowid)
+
+    def report_bundle(self, id, notes_limit=25):
+        """
+        Retrieve everything a report needs about an ID in one snapshot.
+
+        Runs the data and entity version, names, username, event totals
+        and first notes page queries on one connection inside a single read
+        transaction, so the results are consistent with each other.
+        Daily and cumulative event totals share one scan of the rollup.
+
+        Args:
+            id (int): The ID of the employee or team.
+            notes_limit (int): The number of notes on the first page.
+
+        Returns:
+            ReportBundle: The prefetched report data. Wrap it in a
+            `BundledModel` to serve it through the model interface.
+        """
+        with self.pool.connection() as connection, tracing.span("report_bundle", "query"):
+            # Nested in a caller's transaction, that snapshot is used
+            owns_transaction = not connection.in_transaction
+            if owns_transaction:
+                connection.execute("BEGIN")
+            try:
+                version = self.data_version()
+                entity_version = self.entity_version(id)
+                names = self.names()
+                username = self.username(id)
+                events = self.pandas_query(self.statement("report_events"), (id,))
+                notes, notes_cursor = self.notes_page(id, limit=notes_limit)
+            finally:
+                if owns_transaction:
+                    connection.commit()
+
+        return ReportBundle(
+            id=str(id),
+            version=version,
+            entity_version=entity_version,
+            names=names,
+            username=username[0][0] if username else None,
+            events=events,
+            notes=notes,
+            notes_cursor=notes_cursor,
+            notes_limit=notes_limit,
+        )
@@ -0,0 +1,233 @@
+"""
+Incremental maintenance of the daily event rollups.
+
+`event_rollup` holds one row per (entity type, entity id, event date)
+with the day's positive and negative event totals and the running
+totals up to and including that day. `rollup_watermark` stores the
+highest `employee_events` rowid already folded into the rollups, so a
+refresh only aggregates the rows appended since the previous one.
+
+Refreshing writes to the database, so the read models never do it.
+`report/serve.py` refreshes when it sees the database change, and
+`RollupRefresher` does it from a background thread for a single
+process. Rows of `employee_events` are treated as append-only. Pass
+`rebuild=True` after updating or deleting existing events.
+
+Usage:
+    python -m employee_events.rollups [--db PATH] [--rebuild]
+"""
+import argparse
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+
+from .queries import ENTITIES
+from .sql_execution import db_path
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = "employee_events"
+
+ROLLUPS_BEHIND = """
+    SELECT COALESCE((SELECT MAX(rowid) FROM employee_events), 0)
+           > COALESCE((SELECT last_rowid FROM rollup_watermark WHERE name = ?), 0)
+    """
+
+ADD_DAILY_TOTALS = """
+    INSERT INTO event_rollup
+        (entity_type, entity_id, event_date, positive_events, negative_events)
+    SELECT '{name}', {name}_id, event_date,
+           SUM(positive_events), SUM(negative_events)
+    FROM employee_events
+    WHERE rowid > ? AND rowid <= ?
+    GROUP BY {name}_id, event_date
+    ON CONFLICT (entity_type, entity_id, event_date) DO UPDATE
+    SET positive_events = positive_events + excluded.positive_events,
+        negative_events = negative_events + excluded.negative_events
+    """
+
+UPDATE_RUNNING_TOTALS = """
+    WITH changed AS (
+        SELECT {name}_id AS entity_id, MIN(event_date) AS since
+        FROM employee_events
+        WHERE rowid > ? AND rowid <= ?
+        GROUP BY {name}_id
+    ),
+    running AS (
+        SELECT rollup.entity_id,
+               rollup.event_date,
+               changed.since,
+               SUM(rollup.positive_events) OVER entity_days AS cumulative_positive,
+               SUM(rollup.negative_events) OVER entity_days AS cumulative_negative
+        FROM event_rollup AS rollup
+        JOIN changed USING (entity_id)
+        WHERE rollup.entity_type = '{name}'
+        WINDOW entity_days AS (PARTITION BY rollup.entity_id ORDER BY rollup.event_date)
+    )
+    UPDATE event_rollup
+    SET cumulative_positive = running.cumulative_positive,
+        cumulative_negative = running.cumulative_negative
+    FROM running
+    WHERE event_rollup.entity_type = '{name}'
+      AND event_rollup.entity_id = running.entity_id
+      AND event_rollup.event_date = running.event_date
+      AND running.event_date >= running.since
+    """
+
+
+def watermark(connection):
+    """
+    Read the highest `employee_events` rowid included in the rollups.
+
+    Args:
+        connection (sqlite3.Connection): An open database connection.
+
+    Returns:
+        int: The stored watermark, 0 if the rollups were never filled.
+    """
+    row = connection.execute(
+        "SELECT last_rowid FROM rollup_watermark WHERE name = ?", (WATERMARK,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def refresh_rollups(path=db_path, rebuild=False):
+    """
+    Fold the events appended since the last refresh into the rollups.
+
+    New rows are summed per entity and day and added onto the existing
+    daily totals. Running totals are then recomputed from the earliest
+    day each changed entity received events for.
+
+    Args:
+        path (str or Path): The migrated database to refresh.
+        rebuild (bool): Empty the rollups and aggregate every event.
+
+    Returns:
+        int: The number of `employee_events` rows processed.
+    """
+    connection = sqlite3.connect(Path(path), isolation_level=None)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if rebuild:
+                connection.execute("DELETE FROM event_rollup")
+                connection.execute("DELETE FROM rollup_watermark")
+
+            low = watermark(connection)
+            high = connection.execute(
+                "SELECT COALESCE(MAX(rowid), 0) FROM employee_events"
+            ).fetchone()[0]
+
+            processed = 0
+            if high > low:
+                processed = connection.execute(
+                    "SELECT COUNT(*) FROM employee_events WHERE rowid > ? AND rowid <= ?",
+                    (low, high),
+                ).fetchone()[0]
+                for name in ENTITIES:
+                    connection.execute(ADD_DAILY_TOTALS.format(name=name), (low, high))
+                    connection.execute(UPDATE_RUNNING_TOTALS.format(name=name), (low, high))
+                connection.execute(
+                    """
+                    INSERT INTO rollup_watermark (name, last_rowid) VALUES (?, ?)
+                    ON CONFLICT (name) DO UPDATE SET last_rowid = excluded.last_rowid
+                    """,
+                    (WATERMARK, high),
+                )
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+    finally:
+        connection.close()
+
+    return processed
+
+
+def refresh_if_behind(path=db_path):
+    """
+    Refresh the rollups only when events were appended since the last refresh.
+
+    The check is two index lookups on a read-only connection, so it is
+    cheap to run often; the write lock is only taken when there is work.
+
+    Args:
+        path (str or Path): The migrated database to refresh.
+
+    Returns:
+        int: The number of `employee_events` rows processed.
+    """
+    connection = sqlite3.connect(f"{Path(path).absolute().as_uri()}?mode=ro", uri=True)
+    try:
+        behind = connection.execute(ROLLUPS_BEHIND, (WATERMARK,)).fetchone()[0]
+    finally:
+        connection.close()
+    return refresh_rollups(path) if behind else 0
+
+
+class RollupRefresher:
+    """
+    Keeps the rollups of a database current from a background thread.
+
+    Every `interval` seconds the thread calls `refresh_if_behind`, so
+    requests never wait on the refresh or its write lock. Run one per
+    database, not one per worker process.
+
+    Args:
+        path (str or Path): The migrated database to refresh.
+        interval (float): Seconds between checks.
+    """
+
+    def __init__(self, path=db_path, interval=2.0):
+        self.path = Path(path)
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start the thread, which exits with the process.
+
+        Returns:
+            RollupRefresher: The started refresher.
+        """
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="rollup-refresher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the thread after the refresh it is running, if any.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                processed = refresh_if_behind(self.path)
+            except sqlite3.Error as error:
+                # Locked or busy: try again at the next check
+                logger.warning("Refreshing the rollups failed: %r", error)
+                continue
+            if processed:
+                logger.info("Rolled up %d new event rows", processed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=db_path, type=Path, help="database to refresh")
+    parser.add_argument("--rebuild", action="store_true", help="re-aggregate every event")
+    args = parser.parse_args(argv)
+
+    processed = refresh_rollups(args.db, rebuild=args.rebuild)
+    print(f"Rolled up {processed} new event rows")
+
+
+if __name__ == "__main__":
+    main()
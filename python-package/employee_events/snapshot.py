@@ -0,0 +1,457 @@
+"""
+An in-memory, columnar snapshot of the employee_events database.
+
+The four tables are loaded once into NumPy arrays, sorted by entity id,
+with the daily event totals and per-employee team totals aggregated at
+load time with `np.add.reduceat`. Queries then become two binary
+searches and an array slice. The snapshot reloads itself, swapping in
+a complete new copy, when the database file or its content changes.
+"""
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .bundle import ReportBundle
+from .employee import Employee
+from .queries import statement
+from .query_base import _decode_cursor, _encode_cursor
+from .team import Team
+
+NOTE_COLUMNS = ["note_date", "note"]
+
+
+def _group_starts(*keys):
+    # Indices where any of the sorted key columns changes value
+    change = np.zeros(len(keys[0]), dtype=bool)
+    change[:1] = True
+    for key in keys:
+        change[1:] |= key[1:] != key[:-1]
+    return np.flatnonzero(change)
+
+
+def _sum_groups(values, starts):
+    if not len(starts):
+        return values[:0]
+    return np.add.reduceat(values, starts)
+
+
+def _span(ids, id):
+    # The slice of rows belonging to `id` in an array sorted by id
+    if id is None:
+        return 0, 0
+    return np.searchsorted(ids, id, "left"), np.searchsorted(ids, id, "right")
+
+
+class _Totals:
+    """
+    Positive and negative event totals grouped by (id, key), sorted.
+    """
+
+    def __init__(self, ids, keys, positive, negative):
+        order = np.lexsort((keys, ids))
+        ids, keys = ids[order], keys[order]
+        starts = _group_starts(ids, keys)
+
+        self.ids = ids[starts]
+        # Python strings slice into DataFrames far faster than
+        # NumPy's fixed-width ones
+        self.keys = keys[starts].astype(object)
+        self.positive = _sum_groups(positive[order], starts)
+        self.negative = _sum_groups(negative[order], starts)
+
+    def running(self):
+        """
+        Return the running totals of each id's rows, in key order.
+        """
+        firsts = _group_starts(self.ids)
+        lengths = np.diff(np.append(firsts, len(self.ids)))
+        cumulative = []
+        for values in (self.positive, self.negative):
+            total = np.cumsum(values)
+            # Subtract everything summed before each id's first row
+            before = np.repeat(total[firsts] - values[firsts], lengths)
+            cumulative.append(total - before)
+        return cumulative
+
+
+class _Notes:
+    """
+    Notes sorted by (id, note_date, rowid), the keyset order.
+    """
+
+    def __init__(self, ids, dates, notes, rowids):
+        order = np.lexsort((rowids, dates, ids))
+        self.ids = ids[order]
+        self.dates = dates[order]
+        self.notes = notes[order]
+        self.rowids = rowids[order]
+
+    def after(self, id, cursor, limit, descending):
+        lo, hi = _span(self.ids, id)
+        if cursor is not None:
+            note_date, rowid = _decode_cursor(cursor)
+            first = lo + np.searchsorted(self.dates[lo:hi], note_date, "left")
+            last = lo + np.searchsorted(self.dates[lo:hi], note_date, "right")
+            side = "left" if descending else "right"
+            split = first + np.searchsorted(self.rowids[first:last], rowid, side)
+            lo, hi = (lo, split) if descending else (split, hi)
+
+        rows = slice(max(lo, hi - limit), hi) if descending else slice(lo, min(hi, lo + limit))
+        page = list(zip(
+            self.dates[rows].tolist(),
+            self.notes[rows].tolist(),
+            self.rowids[rows].tolist(),
+        ))
+        return page[::-1] if descending else page
+
+
+class SnapshotData:
+    """
+    One immutable columnar copy of the database.
+
+    Each entity type ("employee" and "team") has its own daily totals,
+    notes and names, sorted by that entity's id.
+    """
+
+    def __init__(self, version, employee, team, events, notes, rowids):
+        self.version = version
+
+        # The highest rowids `entity_version` is built from:
+        # {"events": {entity: {id: (latest, rolled up)}},
+        #  "notes": {entity: {id: latest}}, "tables": (employee, team)}
+        self.rowids = rowids
+
+        employee_names = employee["first_name"] + " " + employee["last_name"]
+        self.names = {
+            "employee": list(zip(employee_names.tolist(), employee["employee_id"].tolist())),
+            "team": list(zip(team["team_name"].tolist(), team["team_id"].tolist())),
+        }
+        self.usernames = {
+            entity: {id: name for name, id in names}
+            for entity, names in self.names.items()
+        }
+
+        dates = events["event_date"].to_numpy(dtype=str)
+        positive = events["positive_events"].to_numpy()
+        negative = events["negative_events"].to_numpy()
+        self.daily = {}
+        self.cumulative = {}
+        for entity in ("employee", "team"):
+            ids = events[f"{entity}_id"].to_numpy()
+            self.daily[entity] = _Totals(ids, dates, positive, negative)
+            self.cumulative[entity] = self.daily[entity].running()
+
+        # The team model scores each of its employees' totals
+        self.team_employees = _Totals(
+            events["team_id"].to_numpy(),
+            events["employee_id"].to_numpy(),
+            positive,
+            negative,
+        )
+
+        self.notes = {
+            entity: _Notes(
+                notes[f"{entity}_id"].to_numpy(),
+                notes["note_date"].to_numpy(dtype=str),
+                notes["note"].to_numpy(dtype=object),
+                notes["rowid"].to_numpy(),
+            )
+            for entity in ("employee", "team")
+        }
+
+    @classmethod
+    def load(cls, connection):
+        """
+        Read every table in one read transaction.
+        """
+        def read(sql):
+            return pd.read_sql_query(sql, connection)
+
+        connection.execute("BEGIN")
+        try:
+            row = connection.execute(statement("employee.data_version")).fetchone()
+            version = "-".join("0" if value is None else str(value) for value in row)
+            rowids = {"events": {}, "notes": {}, "tables": row[3:5]}
+            for entity in ("employee", "team"):
+                rowids["events"][entity] = {
+                    id: (latest, rolled_up)
+                    for id, latest, rolled_up in connection.execute(f"""
+                        SELECT {entity}_id, MAX(rowid),
+                               MAX(CASE WHEN rowid <= (
+                                   SELECT last_rowid FROM rollup_watermark WHERE name = 'employee_events'
+                               ) THEN rowid END)
+                        FROM employee_events
+                        GROUP BY {entity}_id
+                        """)
+                }
+                rowids["notes"][entity] = dict(connection.execute(
+                    f"SELECT {entity}_id, MAX(rowid) FROM notes GROUP BY {entity}_id"
+                ))
+            data = cls(
+                version,
+                read("SELECT employee_id, first_name, last_name FROM employee ORDER BY rowid"),
+                read("SELECT team_id, team_name FROM team ORDER BY rowid"),
+                read("""
+                    SELECT employee_id, team_id, event_date, positive_events, negative_events
+                    FROM employee_events
+                    """),
+                read("SELECT rowid, employee_id, team_id, note_date, note FROM notes"),
+                rowids,
+            )
+        finally:
+            connection.commit()
+        return data
+
+    def entity_version(self, entity, id):
+        """
+        Build the same token as `QueryBase.entity_version`, for this copy.
+        """
+        latest, rolled_up = self.rowids["events"][entity].get(id, (None, None))
+        parts = (latest, rolled_up, self.rowids["notes"][entity].get(id), *self.rowids["tables"])
+        return "-".join("0" if value is None else str(value) for value in parts)
+
+    def event_counts(self, entity, id, cumulative=False):
+        totals = self.daily[entity]
+        lo, hi = _span(totals.ids, id)
+        positive, negative = self.cumulative[entity] if cumulative else (totals.positive, totals.negative)
+        return pd.DataFrame({
+            "event_date": totals.keys[lo:hi],
+            "positive_events": positive[lo:hi],
+            "negative_events": negative[lo:hi],
+        })
+
+    def model_data(self, entity, id):
+        if entity == "team":
+            totals = self.team_employees
+            lo, hi = _span(totals.ids, id)
+            return pd.DataFrame({
+                "positive_events": totals.positive[lo:hi],
+                "negative_events": totals.negative[lo:hi],
+            })
+
+        # An employee's model data is the sum over all their days
+        totals = self.daily[entity]
+        lo, hi = _span(totals.ids, id)
+        if lo == hi:
+            return pd.DataFrame({"positive_events": [None], "negative_events": [None]})
+        return pd.DataFrame({
+            "positive_events": [totals.positive[lo:hi].sum()],
+            "negative_events": [totals.negative[lo:hi].sum()],
+        })
+
+    def all_model_data(self):
+        # Per (employee, team) totals, as the employee.all_model_data query
+        totals = self.team_employees
+        return pd.DataFrame({
+            "employee_id": totals.keys.astype(np.int64),
+            "team_id": totals.ids,
+            "positive_events": totals.positive,
+            "negative_events": totals.negative,
+        })
+
+    def notes_of(self, entity, id):
+        notes = self.notes[entity]
+        lo, hi = _span(notes.ids, id)
+        return pd.DataFrame({
+            "note_date": notes.dates[lo:hi].tolist(),
+            "note": notes.notes[lo:hi].tolist(),
+        }, columns=NOTE_COLUMNS)
+
+    def username(self, entity, id):
+        name = self.usernames[entity].get(id)
+        return [] if name is None else [(name,)]
+
+    def all_names(self, entity):
+        return list(self.names[entity])
+
+
+class Snapshot:
+    """
+    Keeps a `SnapshotData` copy of a database current.
+
+    At most every `check_interval` seconds, a read compares the file's
+    modification time and SQLite's `PRAGMA data_version`, which changes
+    whenever another connection commits, with their values at the last
+    load. On a change a new copy is loaded and swapped in as a whole, so
+    readers see either the old or the new data, never a mix.
+    """
+
+    def __init__(self, db_path, check_interval=1.0):
+        self.db_path = Path(db_path)
+        self.check_interval = check_interval
+        self._connection = None
+        self._lock = threading.Lock()
+        self._data = None
+        self._marker = None
+        self._checked_at = 0.0
+
+    def _markers(self):
+        # Stat first: a change made during the load is seen next time
+        mtime = os.stat(self.db_path).st_mtime_ns
+        if self._connection is None:
+            self._connection = sqlite3.connect(
+                f"{self.db_path.absolute().as_uri()}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+            )
+        data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+        return mtime, data_version
+
+    def data(self):
+        """
+        Return the current copy of the database, reloading if it changed.
+
+        Returns:
+            SnapshotData: An immutable copy of the tables.
+        """
+        if self._data is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return self._data
+
+        with self._lock:
+            marker = self._markers()
+            if self._data is None or marker != self._marker:
+                self._data = SnapshotData.load(self._connection)
+                self._marker = marker
+            self._checked_at = time.monotonic()
+            return self._data
+
+    def reload(self):
+        """
+        Load a new copy on the next read, whether or not the data changed.
+        """
+        with self._lock:
+            self._marker = None
+            self._checked_at = 0.0
+
+    def close(self, keep_data=False):
+        """
+        Close the connection used to check the database for changes.
+
+        Args:
+            keep_data (bool): Keep serving the loaded copy, e.g. from
+                processes forked after the close. The next check opens
+                a new connection.
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            if not keep_data:
+                self._data = None
+                self._marker = None
+
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_snapshot(db_path):
+    """
+    Return the shared snapshot of a database, creating it on first use.
+    """
+    snapshot = _snapshots.get(db_path)
+    if snapshot is None:
+        with _snapshots_lock:
+            snapshot = _snapshots.setdefault(db_path, Snapshot(db_path))
+    return snapshot
+
+
+def _id(id):
+    # Ids arrive as strings from URLs; SQLite would coerce them too
+    try:
+        return int(id)
+    except (TypeError, ValueError):
+        return None
+
+
+class SnapshotMixin:
+    """
+    Serve the read queries of a `QueryBase` subclass from a snapshot.
+
+    Place it before the model in the bases, e.g.
+    `class SnapshotEmployee(SnapshotMixin, Employee)`. Queries without
+    a snapshot implementation still run against SQLite.
+    """
+
+    def snapshot(self):
+        return get_snapshot(self.pool.db_path).data()
+
+    def names(self):
+        return self.snapshot().all_names(self.name)
+
+    def username(self, id):
+        return self.snapshot().username(self.name, _id(id))
+
+    def search_names(self, text, limit=20):
+        text = text.lower()
+        matches = (row for row in self.snapshot().names[self.name] if text in row[0].lower())
+        return list(itertools.islice(matches, limit))
+
+    def data_version(self):
+        return self.snapshot().version
+
+    def entity_version(self, id):
+        # From the copy the content is served from, so caches never
+        # store the content of an older copy under a newer version
+        return self.snapshot().entity_version(self.name, _id(id))
+
+    def event_counts(self, id):
+        return self.snapshot().event_counts(self.name, _id(id))
+
+    def cumulative_event_counts(self, id):
+        return self.snapshot().event_counts(self.name, _id(id), cumulative=True)
+
+    def model_data(self, id):
+        return self.snapshot().model_data(self.name, _id(id))
+
+    def notes(self, id):
+        return self.snapshot().notes_of(self.name, _id(id))
+
+    def _notes_after(self, id, cursor, limit, descending):
+        return self.snapshot().notes[self.name].after(_id(id), cursor, limit, descending)
+
+    def report_bundle(self, id, notes_limit=25):
+        # Read every part from the same copy of the data
+        data = self.snapshot()
+        entity_id = _id(id)
+        daily = data.event_counts(self.name, entity_id)
+        cumulative = data.event_counts(self.name, entity_id, cumulative=True)
+        rows = data.notes[self.name].after(entity_id, None, notes_limit + 1, False)
+        notes = pd.DataFrame([row[:2] for row in rows[:notes_limit]], columns=NOTE_COLUMNS)
+        username = data.username(self.name, entity_id)
+
+        notes_cursor = None
+        if len(rows) > notes_limit:
+            note_date, _, rowid = rows[notes_limit - 1]
+            notes_cursor = _encode_cursor(note_date, rowid)
+
+        return ReportBundle(
+            id=str(id),
+            version=data.version,
+            entity_version=data.entity_version(self.name, entity_id),
+            names=data.all_names(self.name),
+            username=username[0][0] if username else None,
+            events=daily.assign(
+                cumulative_positive=cumulative["positive_events"],
+                cumulative_negative=cumulative["negative_events"],
+            ),
+            notes=notes,
+            notes_cursor=notes_cursor,
+            notes_limit=notes_limit,
+        )
+
+
+class SnapshotEmployee(SnapshotMixin, Employee):
+
+    def all_model_data(self):
+        return self.snapshot().all_model_data()
+
+
+class SnapshotTeam(SnapshotMixin, Team):
+    pass
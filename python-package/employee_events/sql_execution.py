@@ -1,51 +1,87 @@
-from sqlite3 import connect
 from pathlib import Path
 from functools import wraps
-import pandas as pd
+
+from . import tracing
+from .pool import ConnectionPool
+from .queries import QUERIES
 
 db_path = Path(__file__).parent.absolute() / "employee_events.db"
 
+# Shared by every QueryMixin subclass. Use `configure_pool`
+# to change the settings before the first query runs.
+# Each connection caches a prepared statement for every
+# registered query.
+pool = ConnectionPool(db_path, cached_statements=len(QUERIES)).register_shutdown()
+
+
+def configure_pool(**settings):
+    """
+    Update the settings of the shared connection pool.
+
+    Accepts the keyword arguments of `ConnectionPool`. Idle
+    connections are closed so the next query opens a connection
+    with the new settings.
+
+    Returns:
+        ConnectionPool: The shared connection pool
+    """
+    for key, value in settings.items():
+        if key.startswith("_") or key not in vars(pool):
+            raise TypeError(f"Unknown connection pool setting: {key}")
+        setattr(pool, key, Path(value) if key == "db_path" else value)
+    pool.reset()
+    return pool
+
 
 class QueryMixin:
 
+    pool = pool
 
-    def pandas_query(self, sql_query):
+    def pandas_query(self, sql_query, params=()):
         """
         Execute a SQL query and return the result as a pandas DataFrame.
 
         Args:
             sql_query (str): A valid SQL query string
+            params (tuple): Values bound to the `?` placeholders
 
         Returns:
             pandas.DataFrame: The result of the query as a pandas DataFrame
         """
-        connection = connect(db_path)
-        result = pd.read_sql_query(sql_query, connection)
-        connection.close()
-        return result
+        # Imported on the first query, so processes start without pandas
+        import pandas as pd
 
+        with self.pool.connection() as connection, tracing.query_span(sql_query) as span:
+            df = pd.read_sql_query(sql_query, connection, params=params)
+            span.set(rows=len(df))
+            return df
 
-    def query(self, sql_query):
+
+    def query(self, sql_query, params=()):
         """
         Execute a SQL query and return the result as a list of tuples.
 
         Args:
             sql_query (str): A valid SQL query string
+            params (tuple): Values bound to the `?` placeholders
 
         Returns:
             list: A list of tuples, representing the result of the query
         """
-        connection = connect(db_path)
-        cursor = connection.cursor()
-        result = cursor.execute(sql_query).fetchall()
-        connection.close()
-        return result
+        with self.pool.connection() as connection, tracing.query_span(sql_query) as span:
+            rows = connection.execute(sql_query, params).fetchall()
+            span.set(rows=len(rows))
+            return rows
 
 
 def query(func):
     """
     Decorator that runs a standard sql execution
     and returns a list of tuples
+
+    The decorated function returns either a SQL string or
+    a `(sql, params)` tuple whose params are bound to the
+    statement's `?` placeholders.
     """
 
     @wraps(func)
@@ -53,9 +89,9 @@ def query(func):
         """
         Executes a SQL query generated by the decorated function and returns the result.
 
-        This function acts as a decorator, executing the SQL query string returned
-        by the decorated function. It retrieves the query result as a list of tuples
-        using an SQLite3 cursor.
+        This function acts as a decorator, executing the SQL query string, or
+        `(sql, params)` tuple, returned by the decorated function. It retrieves
+        the query result as a list of tuples using an SQLite3 cursor.
 
         Args:
             *args: Positional arguments passed to the decorated function.
@@ -66,10 +102,12 @@ def query(func):
         """
 
         query_string = func(*args, **kwargs)
-        connection = connect(db_path)
-        cursor = connection.cursor()
-        result = cursor.execute(query_string).fetchall()
-        connection.close()
-        return result
+        params = ()
+        if isinstance(query_string, tuple):
+            query_string, params = query_string
+        with pool.connection() as connection, tracing.query_span(query_string) as span:
+            rows = connection.execute(query_string, params).fetchall()
+            span.set(rows=len(rows))
+            return rows
 
     return run_query
\ No newline at end of file
@@ -15,11 +15,7 @@ class Team(QueryBase):
             List[Tuple[str, int]]: A list of tuples, each containing the name and
             ID of a team.
         """
-        sql_query = f"""
-                    SELECT team_name, team_id
-                    FROM {self.name}
-                    """
-        return self.query(sql_query)
+        return self.query(self.statement("names"))
 
     def username(self, id):
 
@@ -36,12 +32,7 @@ class Team(QueryBase):
         Returns:
             List[Tuple[str]]: A list of tuples, each containing the name of the team as a string.
         """
-        sql_query = f"""
-                        SELECT team_name
-                        FROM {self.name}
-                        WHERE team_id = {id}
-                    """
-        return self.query(sql_query)
+        return self.query(self.statement("username"), (id,))
 
     def model_data(self, id):
 
@@ -60,17 +51,4 @@ class Team(QueryBase):
             pandas.DataFrame: A dataframe containing the count of positive
             and negative events for each employee as a pandas Series.
         """
-        sql_query = f"""
-            SELECT positive_events, negative_events
-            FROM (
-                SELECT employee_id,
-                       SUM(positive_events) AS positive_events,
-                       SUM(negative_events) AS negative_events
-                FROM {self.name}
-                JOIN employee_events
-                    USING({self.name}_id)
-                WHERE {self.name}.{self.name}_id = {id}
-                GROUP BY employee_id
-            )
-        """
-        return self.pandas_query(sql_query)
\ No newline at end of file
+        return self.pandas_query(self.statement("model_data"), (id,))
\ No newline at end of file
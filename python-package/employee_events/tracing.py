@@ -0,0 +1,300 @@
+"""
+Opt-in tracing of where request time goes.
+
+Instrumented code opens spans with `span` or `query_span`. Spans opened
+while another span is open in the same context become its children, so
+each request builds a tree of the queries, components and charts it
+ran. Every finished span is also folded into process-wide duration
+histograms, exported in the Prometheus text format by `prometheus`.
+
+Tracing is off until `enable` is called. While it is off, `span` and
+`query_span` return a shared no-op span after a single flag check,
+and nothing is timed, hashed or recorded.
+
+Usage:
+    from employee_events import tracing
+
+    tracing.enable()
+    with tracing.span("LineChart", "component") as span:
+        ...
+        span.set(rows=10)
+"""
+import hashlib
+import threading
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+
+# The upper bounds, in seconds, of the duration histogram buckets
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_enabled = False
+
+# The innermost open span of the current context
+_current = ContextVar("employee_events_span", default=None)
+
+
+def enable(enabled=True):
+    """
+    Turn tracing on or off for the whole process.
+
+    Args:
+        enabled (bool): Whether spans are recorded.
+    """
+    global _enabled
+    _enabled = enabled
+
+
+def enabled():
+    """
+    Whether tracing is on.
+
+    Returns:
+        bool: True if spans are being recorded.
+    """
+    return _enabled
+
+
+def current():
+    """
+    Return the innermost open span of the current context, if any.
+    """
+    return _current.get()
+
+
+class Span:
+    """
+    A timed operation and the spans opened while it ran.
+
+    Args:
+        name (str): What ran, e.g. a component class or statement hash.
+        kind (str): The layer it ran in: "request", "query",
+            "component", "chart" or "model".
+        attrs (dict): Details such as the number of rows returned.
+    """
+
+    __slots__ = ("name", "kind", "attrs", "children", "start", "duration", "_token")
+
+    def __init__(self, name, kind, attrs=None):
+        self.name = name
+        self.kind = kind
+        self.attrs = attrs or {}
+        self.children = []
+        self.start = None
+        self.duration = None
+        self._token = None
+
+    def __enter__(self):
+        parent = _current.get()
+        if parent is not None:
+            # Children finish on other threads for concurrent renders;
+            # list.append is atomic
+            parent.children.append(self)
+        self._token = _current.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.duration = time.perf_counter() - self.start
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        metrics.record(self)
+        return False
+
+    def set(self, **attrs):
+        """
+        Attach details to the span.
+        """
+        self.attrs.update(attrs)
+
+    def totals(self):
+        """
+        Sum the time spent in each kind of span within this tree.
+
+        Spans nested in a span of the same kind are not counted twice,
+        and spans still running are left out.
+
+        Returns:
+            dict: Maps each kind to a (seconds, count) tuple.
+        """
+        totals = {}
+
+        def visit(span, open_kinds):
+            if span.duration is not None and span.kind not in open_kinds:
+                seconds, count = totals.get(span.kind, (0.0, 0))
+                totals[span.kind] = (seconds + span.duration, count + 1)
+                open_kinds = open_kinds | {span.kind}
+            for child in list(span.children):
+                visit(child, open_kinds)
+
+        visit(self, frozenset())
+        return totals
+
+    def to_dict(self):
+        """
+        Return the span tree as nested dictionaries.
+        """
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "duration_ms": None if self.duration is None else self.duration * 1000,
+            "attrs": dict(self.attrs),
+            "children": [child.to_dict() for child in list(self.children)],
+        }
+
+
+class _NoSpan:
+    """
+    The span returned while tracing is off. Does nothing.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NO_SPAN = _NoSpan()
+
+
+def span(name, kind, **attrs):
+    """
+    Open a span, to be used as a context manager.
+
+    Args:
+        name (str): What is running.
+        kind (str): The layer it runs in.
+        **attrs: Details to attach to the span.
+
+    Returns:
+        Span: A new span, or `NO_SPAN` while tracing is off.
+    """
+    if not _enabled:
+        return NO_SPAN
+    return Span(name, kind, attrs)
+
+
+@lru_cache(maxsize=1024)
+def statement_hash(sql):
+    """
+    Return a short, stable identifier of a SQL statement.
+    """
+    return hashlib.sha1(" ".join(sql.split()).encode()).hexdigest()[:12]
+
+
+def query_span(sql):
+    """
+    Open a span for running a SQL statement, named by its hash.
+
+    Returns:
+        Span: A new "query" span, or `NO_SPAN` while tracing is off.
+    """
+    if not _enabled:
+        return NO_SPAN
+    return Span(statement_hash(sql), "query")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class Metrics:
+    """
+    Process-wide aggregates of finished spans.
+
+    Keeps a duration histogram per span kind and name, the rows
+    returned per SQL statement and the requests served per route and
+    status.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            # (kind, name) -> [bucket counts..., +Inf count, sum]
+            self.durations = {}
+            self.rows = {}
+            self.requests = {}
+
+    def record(self, span):
+        with self._lock:
+            histogram = self.durations.get((span.kind, span.name))
+            if histogram is None:
+                histogram = self.durations[(span.kind, span.name)] = [0] * (len(BUCKETS) + 1) + [0.0]
+            for index, bound in enumerate(BUCKETS):
+                if span.duration <= bound:
+                    histogram[index] += 1
+            histogram[len(BUCKETS)] += 1
+            histogram[-1] += span.duration
+
+            if span.kind == "query" and "rows" in span.attrs:
+                self.rows[span.name] = self.rows.get(span.name, 0) + span.attrs["rows"]
+            if span.kind == "request":
+                key = (span.attrs.get("method", ""), span.name, span.attrs.get("status", ""))
+                self.requests[key] = self.requests.get(key, 0) + 1
+
+    def prometheus(self):
+        """
+        Render the aggregates in the Prometheus text exposition format.
+
+        Returns:
+            str: The metric families, one sample per line.
+        """
+        with self._lock:
+            durations = {key: list(value) for key, value in self.durations.items()}
+            rows = dict(self.rows)
+            requests = dict(self.requests)
+
+        lines = [
+            "# HELP report_span_duration_seconds Time spent in traced operations.",
+            "# TYPE report_span_duration_seconds histogram",
+        ]
+        for (kind, name), histogram in sorted(durations.items()):
+            for bound, count in zip(BUCKETS, histogram):
+                lines.append(
+                    f"report_span_duration_seconds_bucket{_labels(kind=kind, name=name, le=bound)} {count}"
+                )
+            lines.append(
+                f"report_span_duration_seconds_bucket{_labels(kind=kind, name=name, le='+Inf')} {histogram[len(BUCKETS)]}"
+            )
+            lines.append(f"report_span_duration_seconds_count{_labels(kind=kind, name=name)} {histogram[len(BUCKETS)]}")
+            lines.append(f"report_span_duration_seconds_sum{_labels(kind=kind, name=name)} {histogram[-1]:.6f}")
+
+        lines += [
+            "# HELP report_query_rows_total Rows returned per SQL statement hash.",
+            "# TYPE report_query_rows_total counter",
+        ]
+        for name, count in sorted(rows.items()):
+            lines.append(f"report_query_rows_total{_labels(statement=name)} {count}")
+
+        lines += [
+            "# HELP report_requests_total Traced requests per route and status.",
+            "# TYPE report_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(requests.items()):
+            lines.append(f"report_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def prometheus():
+    """
+    Render the recorded span metrics in the Prometheus text format.
+    """
+    return metrics.prometheus()
@@ -1,4 +1,4 @@
-from .base_component import BaseComponent
+from .base_component import BaseComponent, RenderContext
 from .dropdown import Dropdown
 from .radio import Radio
 from .matplotlib_viz import MatplotlibViz
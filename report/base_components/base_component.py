@@ -1,17 +1,39 @@
+from typing import Any, NamedTuple
+
+from employee_events import tracing
+
+
+class RenderContext(NamedTuple):
+    """
+    The state of a single render.
+
+    Passed to `outer_div` instead of being stored on the component,
+    so one component instance can serve concurrent requests.
+    """
+    entity_id: Any
+    model: Any
+
+
 class BaseComponent:
 
+    # Components are configured in __init__ and never modified while
+    # rendering. Anything that depends on the request belongs in the
+    # RenderContext.
+
     def build_component(self, entity_id, model):
         raise NotImplementedError
-    
-    def outer_div(self, component):
+
+    def outer_div(self, component, context):
         return component
-    
+
 
     def component_data(self, entity_id, model):
         raise NotImplementedError
 
     def __call__(self, entity_id, model):
 
-        component = self.build_component(entity_id, model)
+        with tracing.span(type(self).__name__, "component"):
+            context = RenderContext(entity_id, model)
+            component = self.build_component(entity_id, model)
 
-        return self.outer_div(component)
\ No newline at end of file
+            return self.outer_div(component, context)
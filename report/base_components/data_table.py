@@ -1,31 +1,110 @@
 from .base_component import BaseComponent
-from fasthtml.common import Table, Tr, Th, Td
+from fasthtml.components import Table, Tr, Th, Td, A, Button
+from urllib.parse import urlencode
 
 
 class DataTable(BaseComponent):
 
+    # Rows rendered per page. None renders every row at once
+    page_size = None
 
-    def build_component(self, entity_id, model):
+    # Endpoint serving further pages and re-sorted tables, formatted
+    # with `entity` and `entity_id`. Requires `page_size`.
+    page_url = ""
+
+    # Columns the server can sort the table by
+    sortable_columns = ()
+
+    def build_component(self, entity_id, model, after=None, sort=None, descending=False):
 
         if model.name:
 
-            data = self.component_data(entity_id, model)
+            data, next_page = self.page_data(entity_id, model, after, sort, descending)
 
-            table = Table(
-                Tr(
-                    Th(column) for column in data.columns
-                )
+            return Table(
+                self.header_row(data.columns, entity_id, model, sort, descending),
+                *self.data_rows(data),
+                *self.more_row(data, next_page, entity_id, model, sort, descending),
             )
 
-            for data_row in data.to_numpy():
+    def rows(self, entity_id, model, after=None, sort=None, descending=False):
+        """
+        Render the page following `after`, then a "load more" row if
+        further rows exist, to be appended to an existing table.
+        """
+        data, next_page = self.page_data(entity_id, model, after, sort, descending)
+        return (
+            *self.data_rows(data),
+            *self.more_row(data, next_page, entity_id, model, sort, descending),
+        )
+
+    def page_data(self, entity_id, model, after, sort, descending):
+        """
+        Fetch the rows to display, plus the token of the next page.
+
+        `after` is the token of the page to fetch, None for the first
+        page, and the returned token is None on the last page. The
+        default tokens are row offsets; paginated tables ask
+        `component_data` for one row more than they display, so no
+        more than a page is ever materialized.
+        """
+        if self.page_size is None:
+            return self.component_data(entity_id, model), None
+
+        if sort not in self.sortable_columns:
+            sort = None
+
+        offset = int(after) if after else 0
+        data = self.component_data(
+            entity_id, model,
+            limit=self.page_size + 1,
+            offset=offset,
+            sort=sort,
+            descending=descending,
+        )
+        next_page = str(offset + self.page_size) if len(data) > self.page_size else None
+        return data.iloc[:self.page_size], next_page
+
+    def data_rows(self, data):
+        # Iterate the columns natively instead of through .to_numpy(),
+        # which would upcast mixed columns to a single object array
+        columns = [data[column].tolist() for column in data.columns]
+        return [Tr(*(Td(value) for value in row)) for row in zip(*columns)]
+
+    def header_row(self, columns, entity_id, model, sort, descending):
+        cells = []
+        for column in columns:
+            if self.page_url and column in self.sortable_columns:
+                toggle = column == sort and not descending
+                label = column
+                if column == sort:
+                    label += " ▼" if descending else " ▲"
+                cells.append(Th(A(
+                    label,
+                    href="#",
+                    hx_get=self.url(entity_id, model, sort=column, order="desc" if toggle else "asc"),
+                    hx_target="closest table",
+                    hx_swap="outerHTML",
+                )))
+            else:
+                cells.append(Th(column))
+        return Tr(*cells)
+
+    def more_row(self, data, next_page, entity_id, model, sort, descending):
+        if not (next_page and self.page_url):
+            return ()
 
-                table_row = Tr(
-                    Td(val) for val in data_row
-                )
+        url = self.url(
+            entity_id, model,
+            after=next_page,
+            sort=sort or "",
+            order="desc" if descending else "asc",
+        )
+        return (Tr(Td(
+            Button("Load more", hx_get=url, hx_target="closest tr", hx_swap="outerHTML"),
+            colspan=len(data.columns),
+        )),)
 
-                children = (*table.children, table_row)
-                table.children = children
-            
-            return table
-            
-        
\ No newline at end of file
+    def url(self, entity_id, model, **params):
+        path = self.page_url.format(entity=model.name, entity_id=entity_id)
+        return f"{path}?{urlencode(params)}"
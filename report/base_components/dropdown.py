@@ -1,5 +1,5 @@
 from .base_component import BaseComponent
-from fasthtml.common import Select, Label, Div, Option
+from fasthtml.components import Select, Label, Div, Option
 
 class Dropdown(BaseComponent):
 
@@ -30,10 +30,13 @@ class Dropdown(BaseComponent):
         
         return selector
     
-    def outer_div(self, child):
+    def label_text(self, context):
+        return self.label
+
+    def outer_div(self, child, context):
 
         return Div(
-            Label(self.label, _for=self.id),
+            Label(self.label_text(context), _for=self.id),
             child,
             id=self.id,
         )
@@ -1,63 +1,261 @@
 from .base_component import BaseComponent
 
-import matplotlib.pyplot
-from fasthtml.common import Img
-import matplotlib.pylab as plt
-import matplotlib
+from fasthtml.components import Img, NotStr
+from functools import lru_cache
+import os
 import io
 import base64
+import threading
+import weakref
 
-# This is necessary to prevent matplotlib from causing memory leaks
-# https://stackoverflow.com/questions/31156578/matplotlib-doesnt-release-memory-after-savefig-and-close
-matplotlib.use('Agg')
-matplotlib.rcParams['savefig.transparent'] = True
-matplotlib.rcParams['savefig.format'] = 'png'
+from employee_events import tracing
+
+from cache import LRUCache
+
+
+@lru_cache(maxsize=None)
+def agg():
+    '''
+    Import matplotlib's Figure and Agg canvas on first use, so processes
+    that only render SVG charts never load matplotlib.
+    '''
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    return Figure, FigureCanvasAgg
+
+
+def style_axes(ax, bordercolor='white', fontcolor='white'):
+    '''
+    Color the title, labels, ticks and spines of an axes.
+    '''
+    ax.title.set_color(fontcolor)
+    ax.xaxis.label.set_color(fontcolor)
+    ax.yaxis.label.set_color(fontcolor)
+
+    ax.tick_params(color=bordercolor, labelcolor=fontcolor)
+    for spine in ax.spines.values():
+        spine.set_edgecolor(bordercolor)
+
+
+# The pool each pooled figure belongs to
+_pools = weakref.WeakKeyDictionary()
+
+
+class FigurePool:
+    '''
+    Reusable figures with a single, pre-styled axes each.
+
+    Figures are built with matplotlib's object-oriented API and own
+    their Agg canvas, so rendering never goes through pyplot's global
+    state and each render has a figure to itself. A released figure's
+    axes are cleared, styled again and kept for the next render, up to
+    `maxsize` idle figures.
+    '''
+
+    def __init__(self, maxsize=8, style=style_axes):
+        self.maxsize = maxsize
+        self.style = style
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _new(self):
+        Figure, FigureCanvasAgg = agg()
+        figure = Figure()
+        FigureCanvasAgg(figure)
+        ax = figure.add_subplot()
+        self.style(ax)
+        with self._lock:
+            _pools[figure] = self
+        return figure, ax
+
+    def acquire(self):
+        '''
+        Return an idle figure and its axes, or a new pair.
+        '''
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._new()
+
+    def release(self, figure):
+        '''
+        Clear a figure for reuse and return it to the pool.
+        '''
+        # Figures given more axes or figure-level artists are dropped
+        # rather than taken apart
+        if len(figure.axes) != 1 or figure.legends or figure.texts:
+            return
+        ax = figure.axes[0]
+        ax.clear()
+        self.style(ax)
+        with self._lock:
+            if len(self._idle) < self.maxsize:
+                self._idle.append((figure, ax))
+
+    def fill(self, count=None):
+        '''
+        Create idle figures ahead of the first renders.
+        '''
+        count = self.maxsize if count is None else min(count, self.maxsize)
+        pairs = [self._new() for _ in range(count - len(self._idle))]
+        with self._lock:
+            self._idle.extend(pairs)
+
+
+def close_figure(figure):
+    '''
+    Release a figure that has been saved.
+
+    Pooled figures go back to their pool. Figures made with pyplot are
+    closed, so pyplot does not keep them alive.
+    '''
+    pool = _pools.get(figure)
+    if pool is not None:
+        pool.release(figure)
+    elif figure.canvas.manager is not None:
+        import matplotlib.pyplot as plt
+
+        plt.close(figure)
+
+
+def figure2png(figure):
+    '''
+    Draw a figure with the Agg renderer and return it as PNG bytes.
+    '''
+    buffer = io.BytesIO()
+    with tracing.span("savefig", "chart"):
+        figure.savefig(buffer, format='png', transparent=True)
+    return buffer.getvalue()
+
+
+def matplotlib2png(func):
+    '''
+    Run a function that returns a matplotlib figure
+    and return the figure as PNG bytes.
+    '''
+    def wrapper(*args, **kwargs):
+        with tracing.span("figure", "chart"):
+            figure = func(*args, **kwargs)
+        try:
+            return figure2png(figure)
+        finally:
+            close_figure(figure)
+    return wrapper
+
+
+def png2fasthtml(png):
+    '''
+    Embed PNG bytes in a fasthtml Img as a base64 data URI.
+    '''
+    with tracing.span("base64", "chart"):
+        return Img(src=f'data:image/png;base64, {base64.b64encode(png).decode()}')
 
 
 def matplotlib2fasthtml(func):
     '''
-    Copy of https://github.com/koaning/fh-matplotlib, which is currently hardcoding the 
+    Copy of https://github.com/koaning/fh-matplotlib, which is currently hardcoding the
     image format as jpg. png or svg is needed here.
     '''
+    render = matplotlib2png(func)
+
     def wrapper(*args, **kwargs):
-        # Reset the figure to prevent accumulation. Maybe we need a setting for this?
-        fig = plt.figure()
-
-        # Run function as normal
-        func(*args, **kwargs)
-
-        # Store it as base64 and put it into an image.
-        my_stringIObytes = io.BytesIO()
-        plt.savefig(my_stringIObytes)
-        my_stringIObytes.seek(0)
-        my_base64_jpgData = base64.b64encode(my_stringIObytes.read()).decode()
-
-        # Close the figure to prevent memory leaks
-        plt.close(fig)
-        plt.close('all')
-        return Img(src=f'data:image/jpg;base64, {my_base64_jpgData}')
+        return png2fasthtml(render(*args, **kwargs))
     return wrapper
 
 
 class MatplotlibViz(BaseComponent):
 
-    @matplotlib2fasthtml
+    # Path segment identifying the chart in /chart/{kind}/... URLs
+    kind = ""
+
+    # "inline" embeds the image in the page, "url" points
+    # an Img at the cacheable /chart endpoint instead
+    image_mode = "inline"
+
+    # "matplotlib" draws the chart with `visualization`, "svg" builds
+    # it directly with `svg_visualization`. Set it on a component,
+    # or on MatplotlibViz to switch every chart
+    renderer = os.environ.get("REPORT_CHART_RENDERER", "matplotlib")
+
+    media_types = {"matplotlib": "image/png", "svg": "image/svg+xml"}
+
+    # Encoded images keyed by (component class, renderer, entity
+    # type, entity id, entity version). Shared by every chart component.
+    cache = LRUCache(maxsize=512, ttl=60 * 60)
+
+    # An optional cache.DiskCache behind `cache`, shared by every
+    # process on the host and filled ahead of time by warm_cache.py
+    disk_cache = None
+
+    # Figures handed out by `subplots`, shared by every chart component
+    figures = FigurePool()
+
     def build_component(self, entity_id, model):
+        version = model.entity_version(entity_id)
+        if self.image_mode == "url":
+            return Img(src=self.chart_url(entity_id, model, version))
+
+        image, media_type = self.image(entity_id, model, version)
+        if media_type == "image/svg+xml":
+            return NotStr(image.decode())
+        return png2fasthtml(image)
+
+    def chart_url(self, entity_id, model, version):
+        return f"/chart/{self.kind}/{model.name}/{entity_id}?v={version}"
+
+    def image(self, entity_id, model, version=None):
+        """
+        Return the chart's encoded image and media type,
+        rendering it with the selected renderer on a cache miss.
+        """
+        if version is None:
+            version = model.entity_version(entity_id)
+        key = (type(self), self.renderer, model.name, str(entity_id), version)
+        image = self.cache.get_or_set(key, lambda: self.stored_render(key, entity_id, model))
+        return image, self.media_types[self.renderer]
+
+    def stored_render(self, key, entity_id, model):
+        # The disk tier is keyed by class name, which is stable across processes
+        if self.disk_cache is None:
+            return self.render(entity_id, model)
+        disk_key = (type(self).__qualname__, *key[1:])
+        image = self.disk_cache.get(disk_key)
+        if image is None:
+            image = self.render(entity_id, model)
+            self.disk_cache.set(disk_key, image)
+        return image
+
+    def render(self, entity_id, model):
+        with tracing.span(type(self).__name__, "chart", renderer=self.renderer):
+            if self.renderer == "svg":
+                return self.svg_visualization(entity_id, model).encode()
+            if self.renderer == "matplotlib":
+                return self.render_png(entity_id, model)
+            raise ValueError(f"Unknown chart renderer: {self.renderer!r}")
+
+    @matplotlib2png
+    def render_png(self, entity_id, model):
         return self.visualization(entity_id, model)
-    
-    
+
+    def svg_visualization(self, entity_id, model):
+        raise NotImplementedError
+
+    def subplots(self):
+        """
+        Return a figure and axes for `visualization` to draw on.
+
+        The figure is taken from `figures` and returned to it once
+        `render_png` has saved it.
+        """
+        return self.figures.acquire()
+
     def visualization(self, entity_id, model):
         pass
 
     def set_axis_styling(self, ax, bordercolor='white', fontcolor='white'):
-        
-        ax.title.set_color(fontcolor)
-        ax.xaxis.label.set_color(fontcolor)
-        ax.yaxis.label.set_color(fontcolor)
-
-        ax.tick_params(color=bordercolor, labelcolor=fontcolor)
-        for spine in ax.spines.values():
-            spine.set_edgecolor(bordercolor)
+
+        style_axes(ax, bordercolor, fontcolor)
 
         for line in ax.get_lines():
             line.set_linewidth(4)
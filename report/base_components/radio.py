@@ -1,5 +1,5 @@
 from .base_component import BaseComponent
-from fasthtml.common import Input, Label, Div
+from fasthtml.components import Input, Label, Div
 
 class Radio(BaseComponent):
 
@@ -22,7 +22,7 @@ class Radio(BaseComponent):
 
         return children
     
-    def outer_div(self, component):
+    def outer_div(self, component, context):
         return Div(
             *component
         )
\ No newline at end of file
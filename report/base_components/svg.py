@@ -0,0 +1,158 @@
+"""
+Minimal SVG chart rendering straight from NumPy arrays.
+
+Produces the two chart types the report needs without importing
+matplotlib. The look follows `MatplotlibViz.set_axis_styling`:
+white text, ticks and spines on a transparent background, with
+thick dash-dot lines in matplotlib's default colors.
+"""
+from html import escape
+
+import numpy as np
+
+WIDTH, HEIGHT = 640, 480
+MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, MARGIN_BOTTOM = 90, 20, 60, 70
+COLORS = ("#1f77b4", "#ff7f0e", "#2ca02c", "#d62728")
+DASHDOT = "16 6 3 6"
+
+
+def _svg(body, width=WIDTH, height=HEIGHT):
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="DejaVu Sans, sans-serif" fill="white">'
+        f"{''.join(body)}</svg>"
+    )
+
+
+def _text(x, y, text, size, anchor="middle", rotate=None):
+    transform = f' transform="rotate({rotate} {x} {y})"' if rotate else ""
+    return (
+        f'<text x="{x:.1f}" y="{y:.1f}" font-size="{size}" '
+        f'text-anchor="{anchor}"{transform}>{escape(str(text))}</text>'
+    )
+
+
+def _frame(left, top, right, bottom):
+    return (
+        f'<rect x="{left}" y="{top}" width="{right - left}" height="{bottom - top}" '
+        f'fill="none" stroke="white" stroke-width="1"/>'
+    )
+
+
+def _ticks(low, high, count=5):
+    """Pick round tick values spanning [low, high]."""
+    if high <= low:
+        return np.array([low])
+    raw = (high - low) / count
+    magnitude = 10 ** np.floor(np.log10(raw))
+    step = magnitude * min((1, 2, 2.5, 5, 10), key=lambda m: abs(m * magnitude - raw))
+    return np.arange(np.ceil(low / step) * step, high + step / 2, step)
+
+
+def _points(x, y):
+    """Format coordinates for a polyline in a single string operation."""
+    xy = np.empty(2 * len(x))
+    xy[0::2], xy[1::2] = x, y
+    return ("%.1f,%.1f " * len(x)) % tuple(xy.tolist())
+
+
+def _label(value):
+    return f"{value:g}"
+
+
+def line_chart(x_labels, series, title="", xlabel="", ylabel=""):
+    """
+    Render one or more lines sharing a categorical x axis.
+
+    Args:
+        x_labels (numpy.ndarray): The x axis labels, e.g. dates.
+        series (dict): Maps each legend label to a y-value array
+            with the same length as `x_labels`.
+        title (str): The chart title.
+        xlabel (str): The x axis label.
+        ylabel (str): The y axis label.
+
+    Returns:
+        str: The SVG document.
+    """
+    left, top = MARGIN_LEFT, MARGIN_TOP
+    right, bottom = WIDTH - MARGIN_RIGHT, HEIGHT - MARGIN_BOTTOM
+    body = [_frame(left, top, right, bottom)]
+
+    count = len(x_labels)
+    values = [np.asarray(y, dtype=float) for y in series.values()]
+    high = max((y.max() for y in values if y.size), default=1.0)
+    low = min((y.min() for y in values if y.size), default=0.0)
+    if high == low:
+        high = low + 1
+    pad = (high - low) * 0.05
+    low, high = low - pad, high + pad
+
+    x = left + np.arange(count) * ((right - left) / max(count - 1, 1))
+
+    def scale(y):
+        return bottom - (y - low) * ((bottom - top) / (high - low))
+
+    for tick in _ticks(low, high):
+        y = scale(tick)
+        body.append(f'<line x1="{left - 5}" y1="{y:.1f}" x2="{left}" y2="{y:.1f}" stroke="white"/>')
+        body.append(_text(left - 8, y + 4, _label(tick), 11, anchor="end"))
+
+    for index in np.linspace(0, count - 1, num=min(count, 4)).astype(int):
+        body.append(f'<line x1="{x[index]:.1f}" y1="{bottom}" x2="{x[index]:.1f}" y2="{bottom + 5}" stroke="white"/>')
+        body.append(_text(x[index], bottom + 18, x_labels[index], 11))
+
+    for color, y in zip(COLORS, values):
+        body.append(
+            f'<polyline points="{_points(x, scale(y))}" fill="none" stroke="{color}" '
+            f'stroke-width="4" stroke-dasharray="{DASHDOT}"/>'
+        )
+
+    for row, (color, name) in enumerate(zip(COLORS, series)):
+        y = top + 18 + row * 20
+        body.append(
+            f'<line x1="{left + 10}" y1="{y - 4}" x2="{left + 40}" y2="{y - 4}" '
+            f'stroke="{color}" stroke-width="4" stroke-dasharray="{DASHDOT}"/>'
+        )
+        body.append(_text(left + 46, y, name, 12, anchor="start"))
+
+    body.append(_text(WIDTH / 2, top - 20, title, 30))
+    body.append(_text((left + right) / 2, HEIGHT - 22, xlabel, 20))
+    body.append(_text(24, (top + bottom) / 2, ylabel, 22, rotate=-90))
+    return _svg(body)
+
+
+def bar_chart(value, xlim=(0, 1), title=""):
+    """
+    Render a single horizontal bar.
+
+    Args:
+        value (float): The length of the bar.
+        xlim (tuple): The lower and upper bound of the x axis.
+        title (str): The chart title.
+
+    Returns:
+        str: The SVG document.
+    """
+    left, top = MARGIN_LEFT, MARGIN_TOP
+    right, bottom = WIDTH - MARGIN_RIGHT, HEIGHT - MARGIN_BOTTOM
+    body = [_frame(left, top, right, bottom)]
+
+    low, high = xlim
+
+    def scale(x):
+        return left + (x - low) * ((right - left) / (high - low))
+
+    for tick in _ticks(low, high):
+        x = scale(tick)
+        body.append(f'<line x1="{x:.1f}" y1="{bottom}" x2="{x:.1f}" y2="{bottom + 5}" stroke="white"/>')
+        body.append(_text(x, bottom + 18, _label(tick), 11))
+
+    height = (bottom - top) * 0.8
+    width = scale(min(max(value, low), high)) - left
+    body.append(
+        f'<rect x="{left}" y="{top + (bottom - top - height) / 2:.1f}" '
+        f'width="{width:.1f}" height="{height:.1f}" fill="{COLORS[0]}"/>'
+    )
+    body.append(_text(WIDTH / 2, top - 20, title, 27))
+    return _svg(body)
@@ -0,0 +1,151 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+class LRUCache:
+    """
+    A thread-safe, size-bounded cache with an optional time to live.
+
+    The least recently used entry is evicted once `maxsize` entries are
+    stored. Entries older than `ttl` seconds are treated as missing.
+    Lookups are counted in the `hits` and `misses` attributes.
+    """
+
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key, compute):
+        """
+        Return the cached value for `key`, computing and storing it
+        with `compute()` on a miss.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """
+        Return the hit and miss counters and the current size.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+def _mtime(path):
+    # Another process may have pruned the file already
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0
+
+
+class DiskCache:
+    """
+    A file-per-entry cache of bytes values, shared across processes.
+
+    Keys are hashed into file names, and each file is written to a
+    temporary name and renamed into place, so readers never see a
+    partial entry. Once more than `maxsize` entries are stored, the
+    least recently written ones are deleted.
+    """
+
+    def __init__(self, directory, maxsize=4096):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return self.directory / f"{digest}.entry"
+
+    def get(self, key, default=None):
+        try:
+            value = self.path(key).read_bytes()
+        except FileNotFoundError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(value)
+        os.replace(temporary, self.path(key))
+        self.prune()
+
+    def prune(self):
+        entries = list(self.directory.glob("*.entry"))
+        if len(entries) <= self.maxsize:
+            return
+        entries.sort(key=_mtime)
+        for path in entries[:len(entries) - self.maxsize]:
+            path.unlink(missing_ok=True)
+
+    def clear(self):
+        for path in self.directory.glob("*.entry"):
+            path.unlink(missing_ok=True)
+
+    def __len__(self):
+        return sum(1 for _ in self.directory.glob("*.entry"))
+
+    def stats(self):
+        """
+        Return the hit and miss counters and the current size.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self),
+            "maxsize": self.maxsize,
+        }
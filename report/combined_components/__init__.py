@@ -1,2 +1,2 @@
-from .combined_component import CombinedComponent
+from .combined_component import CombinedComponent, track_placeholders
 from .form_group import FormGroup
\ No newline at end of file
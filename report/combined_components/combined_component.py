@@ -1,38 +1,188 @@
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from employee_events import tracing
+from employee_events.sql_execution import pool
 from fastcore.xml import FT
-from fasthtml.common import Div
+from fasthtml.components import Div
+
+logger = logging.getLogger(__name__)
+
+# One executor per CombinedComponent subclass, so a nested combined
+# component never waits on a worker its parent is occupying. Children
+# are submitted under the lock, so an executor is never shut down
+# between being looked up and being used.
+_executors = {}
+_executors_lock = threading.RLock()
+
+# The names of the children replaced by a placeholder during the
+# current render. Concurrent children run in copies of the context,
+# which share the list.
+_placeholders = contextvars.ContextVar("placeholders", default=None)
+
+
+@contextmanager
+def track_placeholders():
+    """
+    Collect the children rendered as placeholders within the block.
+
+    Yields the list of their class names, which is empty if the whole
+    render succeeded. A degraded render should not be cached.
+    """
+    placeholders = []
+    token = _placeholders.set(placeholders)
+    try:
+        yield placeholders
+    finally:
+        _placeholders.reset(token)
+
+
+class _ChildRun:
+    """
+    Runs one child on the executor and records when it started.
+    """
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.started_at = None
+
+    def __call__(self, call, *args):
+        self.started_at = time.monotonic()
+        self.started.set()
+        return call(*args)
+
 
 class CombinedComponent:
 
+    # A template for the wrapping element. Every render builds a new
+    # element from it, so the template itself is never modified.
     outer_div_type = Div(cls='container')
-    
+
+    # Render the children on a thread pool instead of one after another.
+    # The output keeps the order of `children` either way.
+    concurrent = False
+
+    # Seconds a concurrent render waits for each child, counted from
+    # when the child starts running, before rendering the child's
+    # placeholder instead. Children still waiting for a worker this
+    # long after being submitted are cancelled and replaced too.
+    child_timeout = None
+
+    # Worker threads shared by every render of this class. None gives
+    # one per pooled database connection, so children queue for a
+    # worker rather than for a connection.
+    max_workers = None
+
     def __call__(self, userid, model):
-       
-       called_children = self.call_children(userid, model)
-       div_args = self.div_args(userid, model)
 
-       return self.outer_div(called_children, div_args)
-    
+       with tracing.span(type(self).__name__, "component"):
+           called_children = self.call_children(userid, model)
+           div_args = self.div_args(userid, model)
+
+           return self.outer_div(called_children, div_args)
+
     def call_children(self, userid, model):
 
+        if self.concurrent:
+            return self.call_children_concurrently(userid, model)
+
         called = []
         for child in self.children:
-            if isinstance(child, FT):
-                called.append(child())
-                
-            else:
-                called.append(child(userid, model))
-        
+            called.append(self.call_child(child, userid, model))
+
+        return called
+
+    def call_child(self, child, userid, model):
+        if isinstance(child, FT):
+            return child()
+
+        return child(userid, model)
+
+    def call_children_concurrently(self, userid, model):
+
+        runs = [_ChildRun() for _ in self.children]
+        with _executors_lock:
+            executor = self.executor()
+            # Each child runs in a copy of this thread's context, so its
+            # tracing spans nest under this component's
+            futures = [
+                executor.submit(contextvars.copy_context().run, run, self.call_child, child, userid, model)
+                for child, run in zip(self.children, runs)
+            ]
+        submitted = time.monotonic()
+
+        called = []
+        for child, run, future in zip(self.children, runs, futures):
+            timeout = None
+            if self.child_timeout is not None:
+                # Time spent queued behind other renders is not the
+                # child's, but waiting for a worker is bounded too. A
+                # child that never started is cancelled, and its
+                # result below raises CancelledError.
+                queued = max(0, submitted + self.child_timeout - time.monotonic())
+                if run.started.wait(queued) or not future.cancel():
+                    run.started.wait()
+                    timeout = max(0, run.started_at + self.child_timeout - time.monotonic())
+            try:
+                called.append(future.result(timeout=timeout))
+            except Exception as error:
+                if not future.done():
+                    self.replace_executor(executor)
+                logger.warning("Rendering %s failed: %r", type(child).__name__, error)
+                called.append(self.placeholder(child, error))
+                placeholders = _placeholders.get()
+                if placeholders is not None:
+                    placeholders.append(type(child).__name__)
+
         return called
-    
+
+    def placeholder(self, child, error):
+        """
+        Render in place of a child that failed or timed out.
+        """
+        return Div(
+            f"{type(child).__name__} is currently unavailable.",
+            cls='component-unavailable',
+        )
+
+    @classmethod
+    def executor(cls):
+        with _executors_lock:
+            if cls not in _executors:
+                _executors[cls] = ThreadPoolExecutor(
+                    max_workers=cls.max_workers or pool.size,
+                    thread_name_prefix=cls.__name__,
+                )
+            return _executors[cls]
+
+    @classmethod
+    def replace_executor(cls, executor):
+        """
+        Stop submitting to an executor a timed-out child still occupies.
+
+        A running thread cannot be interrupted, so the next render gets
+        a new executor with every worker free. The old one finishes the
+        work already submitted to it, then its threads exit.
+        """
+        with _executors_lock:
+            if _executors.get(cls) is executor:
+                del _executors[cls]
+                executor.shutdown(wait=False)
+
     def div_args(self, userid, model):
         return {}
-    
+
     def outer_div(self, children, div_args):
 
-        self.outer_div_type.children = ()
+        template = self.outer_div_type
+        outer_div = FT(template.tag, (), dict(template.attrs), void_=template.void_)
 
-        return self.outer_div_type(
+        return outer_div(
             *children,
             **div_args
         )
-    
\ No newline at end of file
+
@@ -0,0 +1,115 @@
+import time
+
+from starlette.routing import Match
+
+from employee_events import tracing
+
+
+class TracingMiddleware:
+    """
+    Opens a root tracing span for each HTTP request.
+
+    The queries, components and charts the request runs become the
+    span's descendants. With `server_timing`, the response carries a
+    `Server-Timing` header with the time spent per kind of span, e.g.
+    `query;dur=4.1;desc="6 spans", component;dur=12.9;desc="9 spans"`.
+
+    Does nothing but check a flag while tracing is disabled.
+
+    Parameters
+    ----------
+    app : ASGI application
+        The application to trace
+    router : starlette.routing.Router, optional
+        The router whose route path templates name the request spans,
+        so `/employee/1` and `/employee/2` are counted together
+    server_timing : bool
+        Add the Server-Timing header to traced responses
+    """
+
+    def __init__(self, app, router=None, server_timing=False):
+        self.app = app
+        self.router = router
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracing.enabled():
+            return await self.app(scope, receive, send)
+
+        root = tracing.Span(self.route(scope), "request", {"method": scope["method"]})
+
+        async def send_traced(message):
+            if message["type"] == "http.response.start":
+                root.set(status=message["status"])
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", self.server_timing_header(root).encode()))
+                    message = dict(message, headers=headers)
+            await send(message)
+
+        with root:
+            await self.app(scope, receive, send_traced)
+
+    def route(self, scope):
+        # Read the routes on each request: fasthtml replaces the list
+        # when routes are added
+        for route in self.router.routes if self.router is not None else ():
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return "unmatched"
+
+    def server_timing_header(self, root):
+        """
+        Summarize the request's spans so far as a Server-Timing value.
+        """
+        metrics = [
+            f'{kind};dur={seconds * 1000:.1f};desc="{count} spans"'
+            for kind, (seconds, count) in sorted(root.totals().items())
+        ]
+        metrics.append(f"total;dur={(time.perf_counter() - root.start) * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+def cache_metrics(caches, pool=None):
+    """
+    Render cache and connection pool statistics as Prometheus gauges.
+
+    Parameters
+    ----------
+    caches : dict
+        Maps a cache name to a cache.LRUCache or cache.DiskCache, or
+        None for a tier that is not configured
+    pool : employee_events.ConnectionPool, optional
+        The connection pool to report the occupancy of
+
+    Returns
+    -------
+    str
+        The metric families in the Prometheus text format
+    """
+    stats = {name: cache.stats() for name, cache in caches.items() if cache is not None}
+    families = [
+        ("report_cache_hits_total", "counter", "Cache lookups that found an entry.", "hits"),
+        ("report_cache_misses_total", "counter", "Cache lookups that found no entry.", "misses"),
+        ("report_cache_entries", "gauge", "Entries currently cached.", "size"),
+        ("report_cache_max_entries", "gauge", "Entries a cache holds before evicting.", "maxsize"),
+    ]
+
+    lines = []
+    for metric, kind, description, key in families:
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} {kind}"]
+        lines += [f'{metric}{{cache="{name}"}} {values[key]}' for name, values in stats.items()]
+
+    if pool is not None:
+        lines += [
+            "# HELP report_pool_connections Database connections per state.",
+            "# TYPE report_pool_connections gauge",
+        ]
+        occupancy = pool.stats()
+        lines += [
+            f'report_pool_connections{{state="{state}"}} {occupancy[state]}'
+            for state in ("open", "idle", "in_use")
+        ]
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,243 @@
+import gzip
+import hashlib
+import json
+import re
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, NamedTuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+
+from cache import LRUCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class CachedResponse(NamedTuple):
+    """
+    A rendered page with its validators and precompressed bodies.
+    """
+
+    etag: str
+    last_modified: float
+    media_type: str
+    # The body per content coding: "identity", "gzip" and, when the
+    # brotli package is installed, "br"
+    bodies: Dict[str, bytes]
+
+    @classmethod
+    def build(cls, body, media_type):
+        bodies = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            bodies["br"] = brotli.compress(body)
+        etag = 'W/"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        return cls(etag, time.time(), media_type, bodies)
+
+    def to_bytes(self):
+        # A JSON header line, followed by the bodies back to back
+        header = {
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "media_type": self.media_type,
+            "bodies": [[coding, len(body)] for coding, body in self.bodies.items()],
+        }
+        return json.dumps(header).encode() + b"\n" + b"".join(self.bodies.values())
+
+    @classmethod
+    def from_bytes(cls, data):
+        header, _, data = data.partition(b"\n")
+        header = json.loads(header)
+        bodies, start = {}, 0
+        for coding, length in header["bodies"]:
+            bodies[coding] = data[start:start + length]
+            start += length
+        return cls(header["etag"], header["last_modified"], header["media_type"], bodies)
+
+    def coding(self, accept_encoding):
+        """
+        Pick the smallest body the client accepts.
+        """
+        accepted = {
+            part.split(";")[0].strip()
+            for part in accept_encoding.lower().split(",")
+            if not part.strip().endswith(";q=0")
+        }
+        for coding in ("br", "gzip"):
+            if coding in self.bodies and coding in accepted:
+                return coding
+        return "identity"
+
+    def not_modified(self, headers):
+        """
+        Whether the request's validators match this response.
+        """
+        if_none_match = headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            # Weak comparison: W/"x" matches "x" and W/"x"
+            return "*" in tags or self.etag.removeprefix("W/") in [
+                tag.removeprefix("W/") for tag in tags
+            ]
+
+        if_modified_since = headers.get("if-modified-since")
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.last_modified) <= since
+
+        return False
+
+
+class ResponseCacheMiddleware:
+    """
+    Serves cached pages for GET requests to matching paths.
+
+    Pages are keyed by path, query string, whether the request came
+    from htmx (which receives a fragment instead of a full page) and
+    the version of the data the page shows, so a change to that data
+    makes the cached page unreachable. Bodies are stored gzip- and, with the
+    optional brotli package, brotli-compressed, and served with `ETag`
+    and `Last-Modified` validators; revalidations that still match
+    receive an empty 304 response.
+
+    Entries live in a bounded in-process LRU, backed by an optional
+    on-disk tier shared by every worker on the host.
+
+    Parameters
+    ----------
+    app : ASGI application
+        The application to cache responses of
+    version : callable
+        Returns the current version of the data shown at the request
+        path it is passed. Called on a worker thread
+    paths : str
+        A regular expression matched against the whole request path
+    memory : cache.LRUCache, optional
+        The in-process tier, 256 pages by default
+    disk : cache.DiskCache, optional
+        The on-disk tier
+    """
+
+    def __init__(self, app, version, paths=r"/(employee|team)/[^/]+", memory=None, disk=None):
+        self.app = app
+        self.version = version
+        self.paths = re.compile(paths)
+        self.memory = LRUCache(maxsize=256) if memory is None else memory
+        self.disk = disk
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in ("GET", "HEAD")
+            or not self.paths.fullmatch(scope["path"])
+        ):
+            return await self.app(scope, receive, send)
+
+        headers = Headers(scope=scope)
+        key = (
+            scope["path"],
+            scope["query_string"].decode("latin-1"),
+            "hx-request" in headers,
+            await run_in_threadpool(self.version, scope["path"]),
+        )
+
+        cached = self.memory.get(key)
+        if cached is None and self.disk is not None:
+            cached = await run_in_threadpool(self.load, key)
+        if cached is None:
+            cached = await self.render(key, scope, receive, send)
+            if cached is None:
+                return
+
+        await self.respond(cached, headers, scope, send)
+
+    def load(self, key):
+        # Promote a page found on disk to the in-process tier
+        data = self.disk.get(key)
+        if data is None:
+            return None
+        cached = CachedResponse.from_bytes(data)
+        self.memory.set(key, cached)
+        return cached
+
+    def store(self, key, cached):
+        self.memory.set(key, cached)
+        if self.disk is not None:
+            self.disk.set(key, cached.to_bytes())
+
+    async def render(self, key, scope, receive, send):
+        """
+        Run the app and cache its response if it is a cacheable page.
+
+        Responses that are not a plain 200 HTML page, or that the app
+        marked `Cache-Control: no-store`, are passed on to the client
+        unchanged and None is returned.
+        """
+        start, chunks = None, []
+
+        async def capture(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            else:
+                chunks.append(message.get("body", b""))
+
+        await self.app(dict(scope, method="GET"), receive, capture)
+
+        body = b"".join(chunks)
+        response_headers = Headers(raw=start["headers"])
+        media_type = response_headers.get("content-type", "")
+        if (
+            start["status"] != 200
+            or not media_type.startswith("text/html")
+            or "set-cookie" in response_headers
+            or "content-encoding" in response_headers
+            or "no-store" in response_headers.get("cache-control", "")
+        ):
+            await send(start)
+            await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+            return None
+
+        cached = await run_in_threadpool(CachedResponse.build, body, media_type)
+        await run_in_threadpool(self.store, key, cached)
+        return cached
+
+    async def respond(self, cached, headers, scope, send):
+        response_headers = [
+            (b"etag", cached.etag.encode()),
+            (b"last-modified", formatdate(cached.last_modified, usegmt=True).encode()),
+            (b"cache-control", b"no-cache"),
+            (b"vary", b"Accept-Encoding, HX-Request"),
+        ]
+
+        if cached.not_modified(headers):
+            await send({"type": "http.response.start", "status": 304, "headers": response_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        coding = cached.coding(headers.get("accept-encoding", ""))
+        body = cached.bodies[coding]
+        response_headers += [
+            (b"content-type", cached.media_type.encode()),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        if coding != "identity":
+            response_headers.append((b"content-encoding", coding.encode()))
+
+        await send({"type": "http.response.start", "status": 200, "headers": response_headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+    def stats(self):
+        """
+        Return the hit and miss counters of each tier.
+        """
+        stats = {"memory": self.memory.stats()}
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+        return stats
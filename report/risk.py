@@ -0,0 +1,189 @@
+import argparse
+import json
+import threading
+
+from employee_events import Employee, Team, tracing
+
+FEATURES = ["positive_events", "negative_events"]
+
+
+class RiskScorer:
+    """
+    Scores the recruitment risk of every employee and team at once.
+
+    The positive and negative event totals of all employees are read
+    with a single grouped query and scored with one vectorized
+    `predict_proba` call. Team risk is the mean risk of the team's
+    employees, as in the per-team bar chart. The resulting tables are
+    kept in memory and rebuilt when the database's data version changes.
+
+    Parameters
+    ----------
+    predictor : object, optional
+        A model with `predict_proba`, loaded on first use by default
+    employee, team : type
+        The model classes the data is read from, e.g. the snapshot
+        models to score from the in-memory copy of the database
+    """
+
+    def __init__(self, predictor=None, employee=Employee, team=Team):
+        self._predictor = predictor
+        self.employee = employee
+        self.team = team
+        # (data version, ranked tables, {entity: {id: risk}}),
+        # replaced as a whole so readers never see a partial rebuild
+        self._state = (None, None, None)
+        self._lock = threading.Lock()
+
+    @property
+    def predictor(self):
+        if self._predictor is None:
+            # Loaded on the first score, not when the dashboard starts
+            from utils import load_model
+
+            self._predictor = load_model()
+        return self._predictor
+
+    def _current(self):
+        version = self.employee().data_version()
+        if self._state[0] != version:
+            with self._lock:
+                if self._state[0] != version:
+                    tables = self.score_all()
+                    scores = {
+                        entity: dict(zip(table["id"].tolist(), table["risk"].tolist()))
+                        for entity, table in tables.items()
+                    }
+                    self._state = (version, tables, scores)
+        return self._state
+
+    def tables(self):
+        """
+        Return the risk tables, rebuilding them if the data changed.
+
+        Returns
+        -------
+        dict
+            Maps "employee" and "team" to a pandas.DataFrame with
+            `rank`, `id`, `name` and `risk` columns, highest risk first
+        """
+        return self._current()[1]
+
+    def score_all(self):
+        """
+        Score every employee and team with one `predict_proba` call.
+        """
+        with tracing.span("score_all", "model"):
+            return self._score_all()
+
+    def _score_all(self):
+        import numpy as np
+        import pandas as pd
+
+        data = self.employee().all_model_data()
+        employee_ids = data["employee_id"].to_numpy()
+        team_ids = data["team_id"].to_numpy()
+        events = data[FEATURES].to_numpy(dtype=float)
+
+        # Employee features are the sums over every team the employee
+        # logged events for
+        employees, employee_rows = np.unique(employee_ids, return_inverse=True)
+        employee_events = np.column_stack([
+            np.bincount(employee_rows, weights=events[:, column], minlength=len(employees))
+            for column in range(events.shape[1])
+        ])
+
+        # Score the employee totals and the per-team rows together
+        features = pd.DataFrame(np.vstack([employee_events, events]), columns=FEATURES)
+        with tracing.span("predict_proba", "model", rows=len(features)):
+            probas = self.predictor.predict_proba(features)[:, 1]
+        employee_risk, team_row_risk = probas[:len(employees)], probas[len(employees):]
+
+        teams, team_rows = np.unique(team_ids, return_inverse=True)
+        team_risk = (
+            np.bincount(team_rows, weights=team_row_risk, minlength=len(teams))
+            / np.bincount(team_rows, minlength=len(teams))
+        )
+
+        return {
+            "employee": self._ranked(employees, employee_risk, self.employee()),
+            "team": self._ranked(teams, team_risk, self.team()),
+        }
+
+    def _ranked(self, ids, risk, model):
+        import numpy as np
+        import pandas as pd
+
+        names = {entity_id: name for name, entity_id in model.names()}
+        table = pd.DataFrame({
+            "id": ids,
+            "name": [names.get(entity_id) for entity_id in ids.tolist()],
+            "risk": risk,
+        })
+        table = table.sort_values("risk", ascending=False, kind="stable")
+        table["rank"] = np.arange(1, len(table) + 1)
+        return table.reset_index(drop=True)
+
+    def score(self, entity, entity_id):
+        """
+        Look up the predicted risk of one employee or team.
+
+        Parameters
+        ----------
+        entity : str
+            "employee" or "team"
+        entity_id : int or str
+            The id of the employee or team
+
+        Returns
+        -------
+        float
+            The predicted recruitment risk
+
+        Raises
+        ------
+        KeyError
+            If the entity has no events
+        """
+        scores = self._current()[2][entity]
+        try:
+            return scores[int(entity_id)]
+        except (KeyError, ValueError):
+            raise KeyError(f"No risk score for {entity} {entity_id}") from None
+
+    def ranked(self, entity, top=None):
+        """
+        Return the risk table of an entity type, highest risk first.
+
+        Parameters
+        ----------
+        entity : str
+            "employee" or "team"
+        top : int, optional
+            Only return the `top` riskiest entities
+
+        Returns
+        -------
+        pandas.DataFrame
+            `rank`, `id`, `name` and `risk` columns
+        """
+        table = self.tables()[entity][["rank", "id", "name", "risk"]]
+        return table if top is None else table.head(top)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print the ranked recruitment risk table.")
+    parser.add_argument("entity", choices=["employee", "team"], help="the entity type to rank")
+    parser.add_argument("--top", type=int, help="only show the N riskiest entities")
+    parser.add_argument("--json", action="store_true", help="print JSON records instead of a table")
+    args = parser.parse_args(argv)
+
+    table = RiskScorer().ranked(args.entity, args.top)
+    if args.json:
+        print(json.dumps(table.to_dict(orient="records"), indent=2))
+    else:
+        print(table.to_string(index=False, float_format="{:.3f}".format))
+
+
+if __name__ == "__main__":
+    main()
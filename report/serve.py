@@ -0,0 +1,389 @@
+"""
+Serve the dashboard from several pre-forked worker processes.
+
+The supervisor imports the dashboard once and loads what every worker
+needs, the risk model and scores, matplotlib with a pool of chart
+figures and, with REPORT_BACKEND=snapshot, the in-memory copy of the
+database. It then freezes the loaded objects out of the garbage
+collector's reach and forks the workers, which share those pages
+copy-on-write and accept connections from one listening socket.
+
+A worker exits after serving about --max-requests requests, which
+bounds the memory matplotlib accumulates, and is replaced by a new
+fork. When the database changes, or on SIGHUP, the supervisor folds
+new events into the rollups, reloads the shared state and replaces the
+workers one at a time, so requests keep being served, never wait on a
+rollup refresh, and the new data stays shared. SIGINT and SIGTERM
+stop the workers gracefully.
+
+    python report/serve.py --workers 4 --port 5001 --max-requests 1000
+
+Tracing metrics at /metrics are those of the worker that answers.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from pathlib import Path
+
+from warm_cache import default_workers
+
+
+def log(message):
+    print(f"[serve {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+
+def database_marker(db_path):
+    """
+    Return what changes when the database or its write-ahead log is written.
+    """
+    marker = []
+    for path in (db_path, db_path.with_name(db_path.name + "-wal")):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            marker.append(None)
+        else:
+            marker.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(marker)
+
+
+def preload(dashboard):
+    """
+    Load the state the workers share, and prepare the process to fork.
+
+    SQLite connections must not be used across a fork, so they are
+    closed once the state is loaded; each worker opens its own.
+    """
+    from base_components import MatplotlibViz
+    from employee_events.snapshot import get_snapshot
+
+    gc.unfreeze()
+    MatplotlibViz.figures.fill()
+
+    models = [model() for model in dashboard.models.values()]
+    for model in models:
+        if hasattr(model, "snapshot"):
+            get_snapshot(model.pool.db_path).reload()
+            model.snapshot()
+    dashboard.BarChart.scorer.tables()
+
+    for model in models:
+        if hasattr(model, "snapshot"):
+            get_snapshot(model.pool.db_path).close(keep_data=True)
+        model.pool.reset()
+
+    # Objects left to the collector have their headers written when it
+    # runs, copying the pages they live on into each worker
+    gc.collect()
+    gc.freeze()
+
+
+class Supervisor:
+    """
+    Forks, replaces and stops the dashboard's worker processes.
+
+    Parameters
+    ----------
+    app : ASGI application
+        The app the workers serve
+    listener : socket.socket
+        The bound, listening socket the workers accept connections from
+    workers : int
+        The number of workers to keep running
+    max_requests : int, optional
+        Requests after which a worker exits to be replaced
+    max_requests_jitter : int
+        Up to this many more requests, chosen per worker, so workers
+        are not all replaced at once
+    graceful_timeout : float
+        Seconds a stopping worker is given to finish its requests
+    reload : callable, optional
+        Reloads the shared state before the workers are replaced
+    refresh : callable, optional
+        Brings data derived from the database up to date before a
+        reload; its own writes do not trigger another reload
+    db_path : Path, optional
+        The database to watch for changes
+    watch_interval : float
+        Seconds between checks of the database, 0 to not watch it
+    log_level : str
+        The level of the workers' uvicorn logs
+    """
+
+    tick = 0.2
+
+    def __init__(
+        self,
+        app,
+        listener,
+        workers,
+        max_requests=None,
+        max_requests_jitter=0,
+        graceful_timeout=30.0,
+        reload=None,
+        refresh=None,
+        db_path=None,
+        watch_interval=2.0,
+        log_level="info",
+    ):
+        self.app = app
+        self.listener = listener
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.reload = reload
+        self.refresh = refresh
+        self.db_path = db_path
+        self.watch_interval = watch_interval
+        self.log_level = log_level
+
+        # pid -> monotonic time the worker started
+        self.running = {}
+        # Workers told to stop, which no longer count as running
+        self.retiring = set()
+        self.stopping = False
+        self.reload_requested = False
+        # The database marker the shared state was loaded at
+        self.loaded = None
+
+    def spawn(self):
+        """
+        Fork a worker, which serves until it is stopped or recycled.
+        """
+        pid = os.fork()
+        if pid:
+            self.running[pid] = time.monotonic()
+            return pid
+
+        status = 1
+        try:
+            status = self.serve()
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            # Never return into the supervisor's loop
+            os._exit(status)
+
+    def serve(self):
+        import uvicorn
+
+        # uvicorn handles SIGINT and SIGTERM while it serves;
+        # reloading is up to the supervisor
+        for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+            signal.signal(signum, signal.SIG_IGN)
+
+        config = uvicorn.Config(
+            self.app,
+            lifespan="off",
+            log_level=self.log_level,
+            limit_max_requests=self.max_requests,
+            limit_max_requests_jitter=self.max_requests_jitter,
+            timeout_graceful_shutdown=self.graceful_timeout,
+        )
+        try:
+            uvicorn.Server(config).run(sockets=[self.listener])
+        except SystemExit as error:
+            return error.code if isinstance(error.code, int) else 1
+        return 0
+
+    def retire(self, pid):
+        """
+        Ask a worker to finish its requests and exit.
+        """
+        self.retiring.add(pid)
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def active(self):
+        return [pid for pid in self.running if pid not in self.retiring]
+
+    def reap(self):
+        """
+        Collect the workers that exited.
+        """
+        while self.running:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+
+            started = self.running.pop(pid, None)
+            retired = pid in self.retiring
+            self.retiring.discard(pid)
+            code = os.waitstatus_to_exitcode(status)
+            if not retired and not self.stopping:
+                if code:
+                    log(f"Worker {pid} exited with status {code}")
+                    # Do not fork in a tight loop if workers cannot start
+                    if started is not None and time.monotonic() - started < 1:
+                        time.sleep(1)
+                else:
+                    log(f"Worker {pid} recycled")
+
+    def rolling_reload(self):
+        """
+        Reload the shared state and replace every worker, one at a time.
+
+        Each new worker is forked before an old one is stopped, so the
+        number of workers accepting connections never drops.
+        """
+        log("Reloading")
+        if self.refresh is not None:
+            try:
+                self.refresh()
+            except Exception:
+                # Serve the new data with the rollups as they were
+                traceback.print_exc()
+        if self.db_path is not None:
+            self.loaded = database_marker(self.db_path)
+        if self.reload is not None:
+            self.reload()
+        for pid in self.active():
+            self.spawn()
+            self.retire(pid)
+
+    def request_stop(self, signum, frame):
+        self.stopping = True
+
+    def request_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def run(self):
+        """
+        Keep the workers running until SIGINT or SIGTERM.
+        """
+        signal.signal(signal.SIGINT, self.request_stop)
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGHUP, self.request_reload)
+
+        watching = self.db_path is not None and self.watch_interval > 0
+        self.loaded = seen = database_marker(self.db_path) if watching else None
+        checked_at = time.monotonic()
+
+        try:
+            while not self.stopping:
+                self.reap()
+                while len(self.active()) < self.workers and not self.stopping:
+                    self.spawn()
+
+                if watching and time.monotonic() - checked_at >= self.watch_interval:
+                    checked_at = time.monotonic()
+                    marker = database_marker(self.db_path)
+                    # Wait for the database to stop changing, so a long
+                    # write does not cause a reload per check
+                    if marker != self.loaded and marker == seen:
+                        self.reload_requested = True
+                        self.loaded = marker
+                    seen = marker
+
+                if self.reload_requested:
+                    self.reload_requested = False
+                    self.rolling_reload()
+
+                time.sleep(self.tick)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """
+        Stop every worker, waiting up to the graceful timeout.
+        """
+        self.stopping = True
+        for pid in list(self.running):
+            self.retire(pid)
+
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while self.running and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(self.tick)
+        for pid in self.running:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.running.clear()
+
+
+def listen(host, port, backlog=2048):
+    listener = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(backlog)
+    listener.set_inheritable(True)
+    return listener
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the dashboard from pre-forked worker processes.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per available core)")
+    parser.add_argument("--db", type=Path, help="serve this database instead of the packaged one")
+    parser.add_argument(
+        "--max-requests", type=int, default=1000,
+        help="replace a worker after this many requests, 0 to never replace (default: 1000)",
+    )
+    parser.add_argument(
+        "--max-requests-jitter", type=int, default=100,
+        help="up to this many more requests per worker (default: 100)",
+    )
+    parser.add_argument(
+        "--watch-interval", type=float, default=2.0,
+        help="seconds between checks for database changes, 0 to not reload on changes (default: 2)",
+    )
+    parser.add_argument("--graceful-timeout", type=float, default=30.0, help="seconds to finish requests on stop")
+    parser.add_argument("--log-level", default="info", choices=["critical", "error", "warning", "info", "debug"])
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, "fork"):
+        parser.error("pre-forked workers need os.fork, which this platform lacks")
+
+    from employee_events.sql_execution import configure_pool, pool
+
+    if args.db:
+        configure_pool(db_path=args.db)
+
+    refresh = None
+    if not (pool.read_only or pool.immutable):
+        from employee_events.rollups import refresh_if_behind
+
+        def refresh():
+            processed = refresh_if_behind(pool.db_path)
+            if processed:
+                log(f"Rolled up {processed} new event rows")
+
+    import dashboard
+
+    if refresh is not None:
+        refresh()
+    preload(dashboard)
+    listener = listen(args.host, args.port)
+    workers = args.workers or default_workers()
+    log(f"Serving http://{args.host}:{args.port} with {workers} workers")
+
+    Supervisor(
+        dashboard.app,
+        listener,
+        workers,
+        max_requests=args.max_requests or None,
+        max_requests_jitter=args.max_requests_jitter if args.max_requests else 0,
+        graceful_timeout=args.graceful_timeout,
+        reload=lambda: preload(dashboard),
+        refresh=refresh,
+        db_path=pool.db_path,
+        watch_interval=args.watch_interval,
+        log_level=args.log_level,
+    ).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
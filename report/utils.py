@@ -1,6 +1,9 @@
-import pickle
+import hashlib
+import json
 from pathlib import Path
 
+import numpy as np
+
 # Using the Path object, create a `project_root` variable
 # set to the absolute path for the root of this project directory
 project_root = Path(__file__).resolve().parent.parent
@@ -11,10 +14,126 @@ project_root = Path(__file__).resolve().parent.parent
 # inside the assets directory
 model_path = project_root / "assets" / "model.pkl"
 
+# The coefficients of the pickled model, exported by `export_model`
+coefficients_path = project_root / "assets" / "model.json"
+
+COEFFICIENTS_FORMAT = 1
+
+
+class LogisticScorer:
+    """
+    A NumPy implementation of a fitted binary logistic regression.
+
+    Computes `sigmoid(X @ coef + intercept)` with the coefficients
+    exported from the scikit-learn model, and mirrors the estimator's
+    `predict_proba` and `predict` interface, so it can replace the
+    unpickled model without importing scikit-learn.
+    """
+
+    def __init__(self, coef, intercept, classes=(0, 1), feature_names=None):
+        self.coef_ = np.asarray(coef, dtype=float).reshape(1, -1)
+        self.intercept_ = np.asarray(intercept, dtype=float).reshape(1)
+        self.classes_ = np.asarray(classes)
+        self.feature_names_in_ = None if feature_names is None else np.asarray(feature_names)
+
+    @classmethod
+    def from_estimator(cls, model):
+        return cls(
+            model.coef_,
+            model.intercept_,
+            model.classes_.tolist(),
+            getattr(model, "feature_names_in_", None),
+        )
+
+    def _features(self, X):
+        # Select DataFrame columns by name, like scikit-learn does
+        if self.feature_names_in_ is not None and hasattr(X, "columns"):
+            X = X[list(self.feature_names_in_)]
+        return np.asarray(X, dtype=float)
+
+    def decision_function(self, X):
+        return self._features(X) @ self.coef_[0] + self.intercept_[0]
+
+    def predict_proba(self, X):
+        # Numerically stable sigmoid: 1 / (1 + exp(-z))
+        positive = np.exp(-np.logaddexp(0, -self.decision_function(X)))
+        return np.column_stack([1 - positive, positive])
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+
+def _sha256(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def export_model(model=None, path=None):
+    """
+    Write the coefficients of the pickled model to a JSON artifact.
+
+    The artifact records the SHA-256 of the pickle it was exported
+    from, so `load_model` can tell when it is out of date.
+    """
+    if model is None:
+        model = _load_pickle()
+    if path is None:
+        path = coefficients_path
+    scorer = LogisticScorer.from_estimator(model)
+    artifact = {
+        "format": COEFFICIENTS_FORMAT,
+        "model": "LogisticRegression",
+        "source_sha256": _sha256(model_path) if model_path.is_file() else None,
+        "feature_names": None if scorer.feature_names_in_ is None else scorer.feature_names_in_.tolist(),
+        "classes": scorer.classes_.tolist(),
+        "coef": scorer.coef_[0].tolist(),
+        "intercept": scorer.intercept_[0].item(),
+    }
+    path.write_text(json.dumps(artifact, indent=2) + "\n")
+    return path
+
+
+def _load_coefficients():
+    artifact = json.loads(coefficients_path.read_text())
+    if artifact.get("format") != COEFFICIENTS_FORMAT:
+        return None
+
+    # A retrained pickle without a re-export makes the artifact stale
+    if model_path.is_file() and artifact.get("source_sha256") != _sha256(model_path):
+        return None
+
+    return LogisticScorer(
+        artifact["coef"],
+        artifact["intercept"],
+        artifact["classes"],
+        artifact["feature_names"],
+    )
+
+
+def _load_pickle():
+    import pickle
 
-def load_model():
     # Load the model from the `model_path` file
     with model_path.open("rb") as file:
         model = pickle.load(file)
 
     return model
+
+
+def load_model():
+    """
+    Load the recruitment risk model.
+
+    Prefers the exported coefficients, which only need NumPy, and
+    falls back to unpickling the scikit-learn model when no current
+    export exists.
+    """
+    if coefficients_path.is_file():
+        scorer = _load_coefficients()
+        if scorer is not None:
+            return scorer
+
+    return _load_pickle()
+
+
+if __name__ == "__main__":
+    print(f"Exported {model_path.name} to {export_model()}")
@@ -0,0 +1,212 @@
+"""
+Pre-render every employee and team report into the on-disk caches.
+
+Each report page is requested through the dashboard app in a pool of
+worker processes, which renders the page, its charts and the risk
+scores they show, and stores the page and chart images in the disk
+tiers under REPORT_CACHE_DIR. Servers sharing that directory then
+answer the first request for each report from disk.
+
+A manifest in the cache directory records the entity version each
+report was warmed at, so later runs only re-render reports whose
+data changed since.
+
+    python report/warm_cache.py --cache-dir /var/cache/report
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from employee_events import Employee, Team
+
+ENTITIES = {"employee": Employee, "team": Team}
+
+MANIFEST_NAME = "warm_manifest.json"
+
+CHART_URL = re.compile(r'<img src="(/chart/[^"]+)"')
+
+# The dashboard app of a worker process, created by `_start_worker`
+_client = None
+
+
+def _start_worker(cache_dir):
+    global _client
+    from starlette.testclient import TestClient
+
+    # Read by the dashboard when it is imported
+    os.environ["REPORT_CACHE_DIR"] = cache_dir
+    import dashboard
+
+    _client = TestClient(dashboard.app)
+
+
+def warm_report(entity, entity_id):
+    """
+    Render one report and its charts in a worker, filling the caches.
+
+    Returns
+    -------
+    float
+        The seconds spent rendering
+    """
+    started = time.perf_counter()
+    page = _client.get(f"/{entity}/{entity_id}")
+    page.raise_for_status()
+    # Degraded pages are not cached, so the report still needs warming
+    if "no-store" in page.headers.get("cache-control", ""):
+        raise RuntimeError("rendered with unavailable components")
+    for url in CHART_URL.findall(page.text):
+        _client.get(url).raise_for_status()
+    return time.perf_counter() - started
+
+
+def default_workers():
+    # The cores this process may run on, which can be fewer than the host's
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def load_manifest(path, renderer):
+    try:
+        manifest = json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+    # Charts drawn by another renderer are cached under other keys
+    if manifest.get("renderer") != renderer:
+        return {}
+    return manifest.get("versions", {})
+
+
+def save_manifest(path, renderer, versions):
+    temporary = path.with_suffix(".tmp")
+    temporary.write_text(json.dumps({"renderer": renderer, "versions": versions}, indent=1))
+    os.replace(temporary, path)
+
+
+def stale_reports(entities, versions, force=False):
+    """
+    List the reports whose entity version differs from the manifest.
+
+    Returns
+    -------
+    list
+        (entity, id, current version) tuples
+    """
+    stale = []
+    for entity in entities:
+        model = ENTITIES[entity]()
+        for _, entity_id in model.names():
+            version = model.entity_version(entity_id)
+            if force or versions.get(f"{entity}/{entity_id}") != version:
+                stale.append((entity, entity_id, version))
+    return stale
+
+
+def warm(cache_dir, entities=tuple(ENTITIES), workers=None, force=False, out=sys.stderr):
+    """
+    Render every report whose data changed since the last run.
+
+    Parameters
+    ----------
+    cache_dir : str or Path
+        The cache directory the dashboard reads as REPORT_CACHE_DIR
+    entities : iterable of str
+        The entity types to warm, "employee" and/or "team"
+    workers : int, optional
+        The number of worker processes, one per available core by default
+    force : bool
+        Re-render every report, ignoring the manifest
+
+    Returns
+    -------
+    dict
+        The number of reports warmed, skipped and failed, and the
+        elapsed seconds
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    renderer = os.environ.get("REPORT_CHART_RENDERER", "matplotlib")
+
+    manifest_path = cache_dir / MANIFEST_NAME
+    versions = load_manifest(manifest_path, renderer)
+    entities = list(entities)
+    stale = stale_reports(entities, versions, force)
+    total = sum(len(ENTITIES[entity]().names()) for entity in entities)
+    print(f"{len(stale)} of {total} reports to warm", file=out)
+
+    started = time.perf_counter()
+    warmed = failed = 0
+    saved_at = reported_at = started
+    try:
+        # Spawned workers import the dashboard afresh, with its disk
+        # caches in `cache_dir`
+        with ProcessPoolExecutor(
+            max_workers=workers or default_workers(),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_start_worker,
+            initargs=(str(cache_dir),),
+        ) as pool:
+            futures = {
+                pool.submit(warm_report, entity, entity_id): (entity, entity_id, version)
+                for entity, entity_id, version in stale
+            }
+            for future in as_completed(futures):
+                entity, entity_id, version = futures[future]
+                try:
+                    future.result()
+                except Exception as error:
+                    failed += 1
+                    print(f"Failed to warm {entity} {entity_id}: {error!r}", file=out)
+                else:
+                    warmed += 1
+                    versions[f"{entity}/{entity_id}"] = version
+
+                now = time.perf_counter()
+                if now - reported_at >= 1 or warmed + failed == len(stale):
+                    rate = (warmed + failed) / max(now - started, 1e-9)
+                    print(f"[{warmed + failed}/{len(stale)}] {rate:.1f} reports/s", file=out)
+                    reported_at = now
+                # Keep the progress of an interrupted run
+                if now - saved_at >= 5:
+                    save_manifest(manifest_path, renderer, versions)
+                    saved_at = now
+    finally:
+        save_manifest(manifest_path, renderer, versions)
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Warmed {warmed} reports in {elapsed:.1f}s ({warmed / max(elapsed, 1e-9):.1f} reports/s), "
+        f"{total - len(stale)} unchanged, {failed} failed",
+        file=out,
+    )
+    return {"warmed": warmed, "skipped": total - len(stale), "failed": failed, "seconds": elapsed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-render reports into the dashboard's disk caches.")
+    parser.add_argument(
+        "--cache-dir",
+        default=os.environ.get("REPORT_CACHE_DIR"),
+        help="the dashboard's REPORT_CACHE_DIR (default: $REPORT_CACHE_DIR)",
+    )
+    parser.add_argument("--entity", choices=list(ENTITIES), action="append", help="only warm this entity type")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per available core)")
+    parser.add_argument("--force", action="store_true", help="re-render reports whose data did not change")
+    args = parser.parse_args(argv)
+
+    if not args.cache_dir:
+        parser.error("pass --cache-dir or set REPORT_CACHE_DIR")
+
+    result = warm(args.cache_dir, args.entity or tuple(ENTITIES), args.workers, args.force)
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
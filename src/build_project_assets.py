@@ -4,10 +4,13 @@ import numpy as np
 import random
 import pickle
 import json
+import importlib.util
 from sqlite3 import connect
 from datetime import timedelta, date
 from sklearn.linear_model import LogisticRegression
 from scipy.stats import norm, expon, skewnorm
+from employee_events.migrations import migrate
+from employee_events.rollups import refresh_rollups
 
 
 cwd = Path('.').resolve()
@@ -164,9 +167,21 @@ with model_path.open('wb') as file:
 
     pickle.dump(model, file)
 
+# Export the coefficients next to the pickle, so the
+# dashboard can score without importing scikit-learn
+spec = importlib.util.spec_from_file_location('report_utils', cwd.parent / 'report' / 'utils.py')
+report_utils = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(report_utils)
+report_utils.export_model(model)
+
 
 db_path = cwd.parent / 'python-package' / 'employee_events' / 'employee_events.db'
 
+# Start from an empty file: rewriting the tables of a migrated database
+# would drop its keys and indexes, while its recorded schema version and
+# rollup watermark would make `migrate` and `refresh_rollups` skip them
+db_path.unlink(missing_ok=True)
+
 connection = connect(db_path)
 
 employee.to_sql('employee', connection, if_exists='replace')
@@ -174,4 +189,9 @@ team.to_sql('team', connection, if_exists='replace')
 notes.to_sql('notes', connection, if_exists='replace')
 events.to_sql('employee_events', connection, if_exists='replace')
 
-connection.close()
\ No newline at end of file
+connection.close()
+
+# Add the primary keys, indexes and rollup tables
+# the query API relies on, then fill the rollups
+migrate(db_path)
+refresh_rollups(db_path)
\ No newline at end of file
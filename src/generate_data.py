@@ -0,0 +1,273 @@
+"""
+Generate a synthetic employee_events database of any size.
+
+Draws the same five employee profiles as build_project_assets.py, but
+samples each profile's events for a whole chunk of employees at once
+with NumPy and streams the rows into SQLite chunk by chunk, so memory
+stays flat however many employees and days are generated. The same
+arguments and seed always produce the same database.
+
+The database is then migrated and its rollups filled, like the one
+shipped with the package. No model is trained.
+
+    python generate_data.py large.db --employees 100000 --teams 2000 --days 1095 --seed 7
+"""
+import argparse
+import json
+import sqlite3
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+from employee_events.migrations import migrate
+from employee_events.rollups import refresh_rollups
+from utils import event_color, complete_color, color_end
+
+data_path = Path(__file__).resolve().parent / 'generated_data'
+
+
+def left_skew(rng, loc, size):
+    # A strongly left-skewed draw in [0, loc], like skewnorm with
+    # a=-1000 rescaled to its sample range in build_project_assets.py
+    spread = np.abs(rng.standard_normal(size)) / 3
+    return (loc * (1 - np.minimum(spread, 1))).astype(int)
+
+
+# Each profile draws `size` positive and negative daily event counts
+profiles = {
+    'good': (
+        lambda rng, size: rng.normal(rng.normal(4, 1, size), 1).astype(int),
+        lambda rng, size: rng.exponential(rng.choice([.5, 1], size)).astype(int),
+    ),
+    'normal': (
+        lambda rng, size: rng.normal(rng.normal(3, 1, size), 1).astype(int),
+        lambda rng, size: rng.normal(2, rng.choice([.5, 1, 2, 3], size)).astype(int),
+    ),
+    'poor': (
+        lambda rng, size: rng.exponential(.5, size).astype(int),
+        lambda rng, size: rng.normal(.5, 1, size).astype(int),
+    ),
+    'chaotic_good': (
+        lambda rng, size: left_skew(rng, 5, size),
+        lambda rng, size: np.where(rng.random(size) < .02, rng.choice([50, 200], size), 0),
+    ),
+    'chotic_bad': (
+        lambda rng, size: rng.exponential(5, size).astype(int),
+        lambda rng, size: left_skew(rng, 10, size),
+    ),
+}
+
+# The unmigrated layout build_project_assets.py writes with pandas,
+# minus the dataframe index. Migrations add keys and indexes.
+SCHEMA = (
+    "CREATE TABLE employee (employee_id INTEGER, first_name TEXT, last_name TEXT, team_id INTEGER)",
+    "CREATE TABLE team (team_id INTEGER, team_name TEXT, shift TEXT, manager_name TEXT)",
+    """
+    CREATE TABLE employee_events (
+        event_date TEXT, employee_id INTEGER, team_id INTEGER,
+        positive_events INTEGER, negative_events INTEGER
+    )
+    """,
+    "CREATE TABLE notes (employee_id INTEGER, team_id INTEGER, note TEXT, note_date TEXT)",
+)
+
+
+def load_seed_data():
+    """
+    Read the names, notes, shifts and managers in generated_data/.
+    """
+    def read(name):
+        with (data_path / f'{name}.json').open('r') as file:
+            return json.load(file)
+
+    employees = read('employees')
+    return {
+        'first_names': sorted({e['name'].split()[0] for e in employees}),
+        'last_names': sorted({e['name'].split()[1] for e in employees}),
+        'notes': [note for e in employees for note in e['notes']],
+        'managers': read('managers'),
+        'shifts': read('shifts'),
+        'team_names': read('team_names'),
+    }
+
+
+def workdays(days, end):
+    """
+    Return the weekdays among the `days` days up to `end` as ISO strings.
+    """
+    end = np.datetime64(end, 'D')
+    dates = np.arange(end - days, end + 1, dtype='datetime64[D]')
+    return np.datetime_as_string(dates[np.is_busday(dates)]).astype(object)
+
+
+def team_rows(rng, teams, seed_data):
+    names = seed_data['team_names']
+    for team_id in range(1, teams + 1):
+        # Past the named teams, number the names: "Alpha Team 2"
+        lap, index = divmod(team_id - 1, len(names))
+        name = names[index] if lap == 0 else f'{names[index]} {lap + 1}'
+        shift = seed_data['shifts'][index % len(seed_data['shifts'])]
+        yield team_id, name, shift, seed_data['managers'][rng.integers(len(seed_data['managers']))]
+
+
+def event_chunk(rng, employee_ids, team_ids, profile_ids, dates):
+    """
+    Draw every event row of a chunk of employees in bulk.
+
+    Returns
+    -------
+    zip
+        (event_date, employee_id, team_id, positive, negative) rows
+    """
+    rows = len(employee_ids) * len(dates)
+    row_profiles = np.repeat(profile_ids, len(dates))
+    positive = np.empty(rows, dtype=np.int64)
+    negative = np.empty(rows, dtype=np.int64)
+    for profile, (draw_positive, draw_negative) in enumerate(profiles.values()):
+        mask = row_profiles == profile
+        size = int(mask.sum())
+        positive[mask] = draw_positive(rng, size)
+        negative[mask] = draw_negative(rng, size)
+
+    return zip(
+        np.tile(dates, len(employee_ids)).tolist(),
+        np.repeat(employee_ids, len(dates)).tolist(),
+        np.repeat(team_ids, len(dates)).tolist(),
+        positive.tolist(),
+        negative.tolist(),
+    )
+
+
+def note_chunk(rng, employee_ids, team_ids, dates, notes, per_employee):
+    counts = rng.poisson(per_employee, len(employee_ids))
+    total = int(counts.sum())
+    return zip(
+        np.repeat(employee_ids, counts).tolist(),
+        np.repeat(team_ids, counts).tolist(),
+        [notes[i] for i in rng.integers(len(notes), size=total)],
+        dates[rng.integers(len(dates), size=total)].tolist(),
+    )
+
+
+def generate(db_path, employees=25, teams=5, days=365, seed=0, chunk_size=1000,
+             notes_per_employee=5, end=None, overwrite=False, out=print):
+    """
+    Write a synthetic, migrated employee_events database.
+
+    Parameters
+    ----------
+    db_path : str or Path
+        The database file to create
+    employees, teams : int
+        The number of employees and teams
+    days : int
+        The number of calendar days of events, ending at `end`.
+        Events are only logged on weekdays.
+    seed : int
+        The random seed
+    chunk_size : int
+        The number of employees whose events are drawn and written at once
+    notes_per_employee : float
+        The mean number of notes per employee
+    end : str, optional
+        The last day, as YYYY-MM-DD. Today by default
+    overwrite : bool
+        Replace `db_path` if it exists
+
+    Returns
+    -------
+    dict
+        The number of rows written per table, and the elapsed seconds
+    """
+    db_path = Path(db_path)
+    if db_path.exists():
+        if not overwrite:
+            raise FileExistsError(f'{db_path} exists, pass overwrite=True to replace it')
+        db_path.unlink()
+
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    seed_data = load_seed_data()
+    dates = workdays(days, end or date.today().isoformat())
+
+    employee_ids = np.arange(1, employees + 1)
+    employee_teams = rng.integers(1, teams + 1, size=employees)
+    employee_profiles = rng.integers(len(profiles), size=employees)
+    first_names = rng.choice(seed_data['first_names'], size=employees).tolist()
+    last_names = rng.choice(seed_data['last_names'], size=employees).tolist()
+
+    connection = sqlite3.connect(db_path)
+    # Nothing to recover if the load is interrupted: start over
+    connection.execute("PRAGMA journal_mode=OFF")
+    connection.execute("PRAGMA synchronous=OFF")
+    counts = {'employee': employees, 'team': teams, 'employee_events': 0, 'notes': 0}
+    with connection:
+        for statement in SCHEMA:
+            connection.execute(statement)
+        connection.executemany(
+            "INSERT INTO employee VALUES (?, ?, ?, ?)",
+            zip(employee_ids.tolist(), first_names, last_names, employee_teams.tolist()),
+        )
+        connection.executemany("INSERT INTO team VALUES (?, ?, ?, ?)", team_rows(rng, teams, seed_data))
+
+    for start in range(0, employees, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        with connection:
+            cursor = connection.executemany(
+                "INSERT INTO employee_events VALUES (?, ?, ?, ?, ?)",
+                event_chunk(rng, employee_ids[chunk], employee_teams[chunk], employee_profiles[chunk], dates),
+            )
+            counts['employee_events'] += cursor.rowcount
+            cursor = connection.executemany(
+                "INSERT INTO notes VALUES (?, ?, ?, ?)",
+                note_chunk(rng, employee_ids[chunk], employee_teams[chunk], dates,
+                           seed_data['notes'], notes_per_employee),
+            )
+            counts['notes'] += cursor.rowcount
+        done = min(start + chunk_size, employees)
+        out(f'{event_color}{done}/{employees} employees, '
+            f'{counts["employee_events"]} events{color_end}')
+    connection.close()
+
+    # Keys and indexes are built once over the full tables
+    migrate(db_path)
+    refresh_rollups(db_path)
+
+    counts['seconds'] = time.perf_counter() - started
+    out(f'{complete_color}Generated {db_path} in {counts["seconds"]:.1f}s{color_end}')
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic employee_events database.')
+    parser.add_argument('db', help='the database file to create')
+    parser.add_argument('--employees', type=int, default=25)
+    parser.add_argument('--teams', type=int, default=5)
+    parser.add_argument('--days', type=int, default=365, help='calendar days of events')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=1000, help='employees drawn and written at once')
+    parser.add_argument('--notes-per-employee', type=float, default=5)
+    parser.add_argument('--end', help='the last day of events, YYYY-MM-DD (default: today)')
+    parser.add_argument('--overwrite', action='store_true', help='replace the database if it exists')
+    args = parser.parse_args(argv)
+
+    if Path(args.db).exists() and not args.overwrite:
+        parser.error(f'{args.db} exists, pass --overwrite to replace it')
+
+    generate(
+        args.db,
+        employees=args.employees,
+        teams=args.teams,
+        days=args.days,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+        notes_per_employee=args.notes_per_employee,
+        end=args.end,
+        overwrite=args.overwrite,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root / "benchmarks"))
+
+from harness import compare, summarize
+
+
+def test_summary_percentiles():
+    """
+    Verify that timings are summarized in milliseconds.
+    """
+    stats = summarize([i / 1000 for i in range(1, 101)], peak=2048)
+    assert stats["n"] == 100
+    assert stats["min_ms"] == pytest.approx(1)
+    assert stats["p50_ms"] == pytest.approx(50.5)
+    assert stats["p99_ms"] == pytest.approx(99.01)
+    assert stats["peak_kib"] == 2
+
+
+def test_compare_flags_regressions_above_threshold_and_noise():
+    """
+    Verify that only slowdowns beyond both the threshold and the
+    noise floor are flagged.
+    """
+    baseline = {
+        "slower": {"p50_ms": 10.0, "p95_ms": 12.0, "peak_kib": 100},
+        "noise": {"p50_ms": 0.01, "p95_ms": 0.02, "peak_kib": 1},
+        "same": {"p50_ms": 5.0, "p95_ms": 6.0, "peak_kib": 100},
+    }
+    results = {
+        "slower": {"p50_ms": 13.0, "p95_ms": 12.5, "peak_kib": 500},
+        "noise": {"p50_ms": 0.03, "p95_ms": 0.05, "peak_kib": 2},
+        "same": {"p50_ms": 5.5, "p95_ms": 6.0, "peak_kib": 110},
+        "new": {"p50_ms": 1.0, "p95_ms": 1.0, "peak_kib": 1},
+    }
+    regressions = compare(results, baseline, threshold=0.2)
+    assert [(r["name"], r["stat"]) for r in regressions] == [("slower", "p50_ms"), ("slower", "peak_kib")]
+
+
+def test_run_writes_results_for_selected_benchmarks():
+    """
+    Verify that a run against the shipped database times the selected
+    benchmarks and records the database it ran against.
+    """
+    import io
+    import run
+
+    db = project_root / "python-package" / "employee_events" / "employee_events.db"
+    result = run.run(db, repeat=2, warmup=1, pattern=r"^(query\.team\.names|http\.employee\.notes)$", out=io.StringIO())
+
+    assert sorted(result["results"]) == ["http.employee.notes", "query.team.names"]
+    assert result["results"]["query.team.names"]["n"] == 2
+    assert result["meta"]["rows"]["employee"] == 25
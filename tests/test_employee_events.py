@@ -101,3 +101,527 @@ def test_employee_events_table_exists(table_names):
     assert (
         "employee_events" in table_names
     ), "Table 'employee_events' does not exist in the database"
+
+
+@pytest.fixture
+def db_copy(db_path, tmp_path):
+    """
+    Return the path to a throwaway copy of the database.
+
+    Tests that write to the database or change its schema use this
+    fixture so the database shipped with the package is left untouched.
+    """
+    import shutil
+
+    target = tmp_path / "employee_events.db"
+    shutil.copy(db_path, target)
+    return target
+
+
+def test_pool_reuses_connections(db_copy):
+    """
+    Verify that sequential checkouts reuse a single pooled connection
+    and that nested checkouts on one thread share the same connection.
+    """
+    from employee_events import ConnectionPool
+
+    pool = ConnectionPool(db_copy, size=2)
+    with pool.connection() as first:
+        with pool.connection() as nested:
+            assert nested is first
+    with pool.connection() as second:
+        assert second is first
+
+    assert pool.stats()["open"] == 1
+    pool.close()
+
+
+def test_pool_is_bounded(db_copy):
+    """
+    Verify that the pool raises once every connection is checked out
+    and the timeout expires.
+    """
+    import threading
+    from employee_events import ConnectionPool, PoolTimeoutError
+
+    pool = ConnectionPool(db_copy, size=1, timeout=0.05)
+    errors = []
+
+    def checkout():
+        try:
+            with pool.connection():
+                pass
+        except PoolTimeoutError as error:
+            errors.append(error)
+
+    with pool.connection():
+        thread = threading.Thread(target=checkout)
+        thread.start()
+        thread.join()
+
+    assert len(errors) == 1
+    pool.close()
+
+
+def test_pool_read_only_and_close(db_copy):
+    """
+    Verify that read-only connections reject writes and that a closed
+    pool refuses further checkouts.
+    """
+    import sqlite3
+    from employee_events import ConnectionPool, PoolClosedError
+
+    pool = ConnectionPool(db_copy, read_only=True, mmap_size=2**20)
+    with pool.connection() as connection:
+        assert connection.execute("SELECT COUNT(*) FROM team").fetchone()[0] > 0
+        with pytest.raises(sqlite3.OperationalError):
+            connection.execute("DELETE FROM team")
+
+    pool.close()
+    with pytest.raises(PoolClosedError):
+        with pool.connection():
+            pass
+
+
+def test_pool_reset_retires_checked_out_connections(db_copy):
+    """
+    Verify that a connection checked out while the pool is reset is
+    closed on release, so the next checkout uses the new settings.
+    """
+    import sqlite3
+    from employee_events import ConnectionPool
+
+    pool = ConnectionPool(db_copy, size=2)
+    with pool.connection() as before:
+        pool.read_only = True
+        pool.reset()
+    assert pool.stats() == {"size": 2, "open": 0, "idle": 0, "in_use": 0}
+
+    with pool.connection() as after:
+        assert after is not before
+        with pytest.raises(sqlite3.OperationalError):
+            after.execute("DELETE FROM team")
+    pool.close()
+
+
+def test_queries_bind_parameters():
+    """
+    Verify that the registered statements bind the ID as a parameter,
+    so string IDs from the URL match and SQL fragments do not.
+    """
+    from employee_events import Employee, Team, QUERIES
+
+    assert all("{" not in sql for sql in QUERIES.values())
+
+    employee = Employee()
+    assert employee.username("1") == employee.username(1)
+    assert employee.username("1 OR 1=1") == []
+    assert len(Team().model_data("1")) > 0
+    assert list(employee.event_counts("1").columns) == [
+        "event_date", "positive_events", "negative_events"
+    ]
+
+
+def test_query_decorator_accepts_params():
+    """
+    Verify that the `query` decorator runs `(sql, params)` tuples
+    as well as plain SQL strings.
+    """
+    from employee_events import query
+
+    @query
+    def team_name(team_id):
+        return "SELECT team_name FROM team WHERE team_id = ?", (team_id,)
+
+    @query
+    def team_count():
+        return "SELECT COUNT(*) FROM team"
+
+    assert len(team_name(1)) == 1
+    assert team_count()[0][0] > 0
+
+
+@pytest.fixture
+def legacy_db(db_path, tmp_path):
+    """
+    Return the path to a database with the original, unmigrated layout.
+
+    The tables are copied with `CREATE TABLE ... AS SELECT`, which drops
+    every primary key and index, like the tables written by pandas.
+    """
+    from sqlite3 import connect
+
+    target = tmp_path / "legacy.db"
+    connection = connect(target)
+    connection.execute("ATTACH DATABASE ? AS source", (str(db_path),))
+    for table in ("employee", "team", "notes", "employee_events"):
+        columns = [
+            row[1] for row in connection.execute(f"PRAGMA source.table_info({table})")
+            if row[1] != "index"
+        ]
+        connection.execute(
+            f'CREATE TABLE {table} AS SELECT rowid - 1 AS "index", '
+            f'{", ".join(columns)} FROM source.{table}'
+        )
+    connection.commit()
+    connection.close()
+    return target
+
+
+def test_migrations_add_keys_and_indexes(legacy_db):
+    """
+    Verify that migrating a legacy database adds the primary keys and
+    covering indexes, keeps every row, and is a no-op when re-run.
+    """
+    from sqlite3 import connect
+    from employee_events.migrations import migrate, MIGRATIONS
+
+    before = connect(legacy_db).execute("SELECT COUNT(*) FROM employee").fetchone()
+
+    assert migrate(legacy_db) == [number for number, _, _ in MIGRATIONS]
+    assert migrate(legacy_db) == []
+
+    connection = connect(legacy_db)
+    assert connection.execute("SELECT COUNT(*) FROM employee").fetchone() == before
+    primary_keys = {
+        table: [row[1] for row in connection.execute(f"PRAGMA table_info({table})") if row[5]]
+        for table in ("employee", "team")
+    }
+    assert primary_keys == {"employee": ["employee_id"], "team": ["team_id"]}
+
+    plan = connection.execute(
+        "EXPLAIN QUERY PLAN SELECT SUM(positive_events) FROM employee_events WHERE employee_id = 1"
+    ).fetchall()
+    assert "COVERING INDEX ix_employee_events_employee_date" in plan[0][3]
+    assert connection.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0] > 0
+
+
+def test_rollups_refresh_incrementally(legacy_db):
+    """
+    Verify that the rollups match a fresh aggregation of the raw events,
+    and that a refresh after appending events only processes the new rows
+    and updates the running totals.
+    """
+    from sqlite3 import connect
+    from employee_events.migrations import migrate
+    from employee_events.rollups import refresh_rollups
+
+    migrate(legacy_db)
+    total = refresh_rollups(legacy_db)
+    assert total > 0
+    assert refresh_rollups(legacy_db) == 0
+
+    connection = connect(legacy_db)
+    connection.execute(
+        "INSERT INTO employee_events (event_date, employee_id, team_id, positive_events, negative_events) "
+        "SELECT MIN(event_date), 1, team_id, 5, 7 FROM employee_events WHERE employee_id = 1"
+    )
+    connection.commit()
+    assert refresh_rollups(legacy_db) == 1
+
+    expected = connection.execute(
+        """
+        SELECT event_date,
+               SUM(SUM(positive_events)) OVER (ORDER BY event_date),
+               SUM(SUM(negative_events)) OVER (ORDER BY event_date)
+        FROM employee_events
+        WHERE employee_id = 1
+        GROUP BY event_date
+        ORDER BY event_date
+        """
+    ).fetchall()
+    rolled_up = connection.execute(
+        """
+        SELECT event_date, cumulative_positive, cumulative_negative
+        FROM event_rollup
+        WHERE entity_type = 'employee' AND entity_id = 1
+        ORDER BY event_date
+        """
+    ).fetchall()
+    assert rolled_up == expected
+
+
+def test_rollups_refresh_in_the_background_not_on_read(db_copy):
+    """
+    Verify that reads never write the rollups, and that the background
+    refresher folds in events appended without running the CLI.
+    """
+    import time
+    from sqlite3 import connect
+    from employee_events import Employee
+    from employee_events.rollups import RollupRefresher, refresh_if_behind, watermark
+    from employee_events.sql_execution import configure_pool
+
+    connection = connect(db_copy)
+    assert refresh_if_behind(db_copy) == 0
+    connection.execute(
+        "INSERT INTO employee_events (event_date, employee_id, team_id, positive_events, negative_events) "
+        "SELECT MAX(event_date), 1, team_id, 5, 7 FROM employee_events WHERE employee_id = 1"
+    )
+    connection.commit()
+    high = connection.execute("SELECT MAX(rowid) FROM employee_events").fetchone()[0]
+    stale = connection.execute(
+        "SELECT cumulative_positive FROM event_rollup "
+        "WHERE entity_type = 'employee' AND entity_id = 1 ORDER BY event_date DESC LIMIT 1"
+    ).fetchone()[0]
+
+    original = Employee.pool.db_path
+    configure_pool(db_path=db_copy)
+    try:
+        Employee().report_bundle(1)
+        assert Employee().cumulative_event_counts(1)["positive_events"].iloc[-1] == stale
+        assert watermark(connection) < high
+
+        refresher = RollupRefresher(db_copy, interval=0.05).start()
+        try:
+            deadline = time.monotonic() + 5
+            while watermark(connection) < high:
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+        finally:
+            refresher.stop()
+        assert Employee().cumulative_event_counts(1)["positive_events"].iloc[-1] == stale + 5
+    finally:
+        configure_pool(db_path=original)
+        connection.close()
+
+
+def test_async_api_matches_sync_api():
+    """
+    Verify that the async models expose the sync methods as coroutines
+    that return the same results, and can be awaited concurrently.
+    """
+    import asyncio
+    import inspect
+    from employee_events import AsyncEmployee, AsyncTeam, Employee, Team
+
+    assert inspect.iscoroutinefunction(AsyncEmployee.model_data)
+    assert inspect.iscoroutinefunction(AsyncTeam.notes)
+
+    async def gather():
+        return await asyncio.gather(
+            AsyncEmployee().username(1),
+            AsyncTeam().names(),
+            AsyncTeam().event_counts(2),
+        )
+
+    username, names, counts = asyncio.run(gather())
+    assert username == Employee().username(1)
+    assert names == Team().names()
+    assert counts.equals(Team().event_counts(2))
+    assert AsyncTeam().name == "team"
+
+
+def test_sorted_notes_pages_through_all_notes():
+    """
+    Verify that sorted note pages are ordered, bounded by the limit,
+    and together return every note exactly once.
+    """
+    import pandas as pd
+    from employee_events import Team
+
+    team = Team()
+    pages = [team.sorted_notes(1, "note_date", True, 10, offset) for offset in range(0, 100, 10)]
+    assert all(len(page) <= 10 for page in pages)
+
+    combined = pd.concat(pages, ignore_index=True)
+    assert combined["note_date"].is_monotonic_decreasing
+    assert sorted(combined["note"]) == sorted(team.notes(1)["note"])
+
+    with pytest.raises(ValueError):
+        team.sorted_notes(1, "note_date; DROP TABLE notes")
+
+
+def test_notes_keyset_pages_and_stream():
+    """
+    Verify that keyset pages follow each other through every note in
+    date order, that the stream yields the same notes in chunks, and
+    that the async stream matches it.
+    """
+    import asyncio
+    from employee_events import AsyncTeam, Team
+
+    team = Team()
+    expected = team.sorted_notes(1, "note_date", True)
+    expected = list(zip(expected["note_date"], expected["note"]))
+
+    pages, cursor = [], None
+    while True:
+        page, cursor = team.notes_page(1, cursor, limit=7, descending=True)
+        assert len(page) <= 7
+        pages.extend(zip(page["note_date"], page["note"]))
+        if cursor is None:
+            break
+    assert pages == expected
+
+    chunks = list(team.iter_notes(1, chunk_size=7, descending=True))
+    assert all(len(chunk) <= 7 for chunk in chunks)
+    assert [row for chunk in chunks for row in chunk] == expected
+
+    async def stream():
+        return [chunk async for chunk in AsyncTeam().iter_notes(1, chunk_size=7, descending=True)]
+
+    assert asyncio.run(stream()) == chunks
+
+    for cursor in ("not-a-cursor", "25", "~25", "2023-01-01~"):
+        with pytest.raises(ValueError):
+            team.notes_page(1, cursor)
+
+
+def test_report_bundle_matches_individual_queries():
+    """
+    Verify that a report bundle holds the same data as the separate
+    queries, and that a bundled model serves them for its own id only.
+    """
+    from employee_events import BundledModel, Team
+
+    team = Team()
+    bundle = team.report_bundle(2, notes_limit=5)
+    model = BundledModel(team, bundle)
+
+    assert bundle.version == team.data_version()
+    assert model.entity_version(2) == team.entity_version(2) != team.entity_version(3)
+    assert model.names() == team.names()
+    assert model.username(2) == team.username(2)
+    assert model.event_counts(2).equals(team.event_counts(2))
+    assert model.cumulative_event_counts(2).equals(team.cumulative_event_counts(2))
+
+    notes, cursor = model.notes_page(2, limit=5)
+    expected, expected_cursor = team.notes_page(2, limit=5)
+    assert notes.equals(expected) and cursor == expected_cursor
+
+    assert model.event_counts(3).equals(team.event_counts(3))
+    assert model.model_data(2).equals(team.model_data(2))
+
+
+def test_snapshot_matches_sql_queries():
+    """
+    Verify that the snapshot models answer every read query exactly
+    like the SQLite models, including for unknown ids.
+    """
+    from employee_events import Employee, SnapshotEmployee, SnapshotTeam, Team
+
+    for snapshot, model in ((SnapshotEmployee(), Employee()), (SnapshotTeam(), Team())):
+        assert snapshot.names() == model.names()
+        assert snapshot.data_version() == model.data_version()
+
+        for id in (1, "2", 5, 999, "x"):
+            assert snapshot.entity_version(id) == model.entity_version(id)
+
+        for id in (1, "2", 5):
+            assert snapshot.username(id) == model.username(id)
+            assert snapshot.event_counts(id).equals(model.event_counts(id))
+            assert snapshot.cumulative_event_counts(id).equals(model.cumulative_event_counts(id))
+            assert snapshot.model_data(id).equals(model.model_data(id))
+            assert list(snapshot.iter_notes(id, 4, True)) == list(model.iter_notes(id, 4, True))
+
+        for text in ("", "a", "AR", "%"):
+            assert snapshot.search_names(text, 5) == model.search_names(text, 5)
+
+        assert snapshot.event_counts(999).empty
+        assert snapshot.notes_page("x")[0].empty
+
+    # Row order is not part of the query's contract
+    columns = ["employee_id", "team_id"]
+    assert SnapshotEmployee().all_model_data().sort_values(columns).reset_index(drop=True).equals(
+        Employee().all_model_data().sort_values(columns).reset_index(drop=True)
+    )
+
+
+def test_snapshot_reloads_when_database_changes(db_copy):
+    """
+    Verify that a snapshot serves its copy until the database is
+    written to, then swaps in a fresh copy.
+    """
+    import sqlite3
+    from employee_events import Snapshot
+
+    snapshot = Snapshot(db_copy, check_interval=0)
+    before = snapshot.data()
+    assert snapshot.data() is before
+
+    with sqlite3.connect(db_copy) as connection:
+        connection.execute(
+            "INSERT INTO notes (employee_id, team_id, note, note_date) VALUES (1, 1, 'New', '2030-01-01')"
+        )
+
+    after = snapshot.data()
+    assert after is not before
+    assert after.version != before.version
+    assert after.entity_version("employee", 1) != before.entity_version("employee", 1)
+    assert after.entity_version("employee", 2) == before.entity_version("employee", 2)
+    assert after.notes_of("employee", 1)["note"].iloc[-1] == "New"
+    snapshot.close()
+
+
+def test_generated_database_is_seeded_and_queryable(tmp_path):
+    """
+    Verify that the synthetic data generator writes the same database
+    for the same seed, and that the models can query it.
+    """
+    import sqlite3
+    import subprocess
+    import sys
+    from employee_events import Employee, Team
+    from employee_events.sql_execution import configure_pool
+
+    def generate(path):
+        return subprocess.run(
+            [sys.executable, "generate_data.py", str(path),
+             "--employees", "12", "--teams", "7", "--days", "30",
+             "--seed", "3", "--chunk-size", "5", "--end", "2024-06-30"],
+            cwd=project_root / "src", capture_output=True, text=True,
+        )
+
+    first, second = tmp_path / "first.db", tmp_path / "second.db"
+    assert generate(first).returncode == 0
+    assert generate(second).returncode == 0
+    refused = generate(first)
+    assert refused.returncode != 0 and "exists" in refused.stderr
+
+    for table in ("employee", "team", "employee_events", "notes", "event_rollup"):
+        with sqlite3.connect(first) as a, sqlite3.connect(second) as b:
+            rows = a.execute(f"SELECT * FROM {table}").fetchall()
+            assert rows == b.execute(f"SELECT * FROM {table}").fetchall()
+            if table == "employee_events":
+                # 20 weekdays in June 2024, plus Friday May 31st
+                assert len(rows) == 12 * 21
+
+    original = Employee.pool.db_path
+    configure_pool(db_path=first)
+    try:
+        assert len(Employee().names()) == 12
+        assert len(Team().names()) == 7
+        assert Employee().event_counts(1)["event_date"].tolist()[0] == "2024-05-31"
+        assert Team().notes_page(1)[0].columns.tolist() == ["note_date", "note"]
+    finally:
+        configure_pool(db_path=original)
+
+
+def test_tracing_spans_nest_and_are_free_when_disabled():
+    """
+    Verify that query spans nest under the span open in the calling
+    context, including across the async API's executor, and that
+    disabled tracing hands out the shared no-op span.
+    """
+    import asyncio
+    from employee_events import AsyncEmployee, Employee, tracing
+
+    assert tracing.span("report", "request") is tracing.NO_SPAN
+    assert tracing.query_span("SELECT 1") is tracing.NO_SPAN
+
+    tracing.enable()
+    try:
+        with tracing.span("report", "request") as root:
+            Employee().username(1)
+            asyncio.run(AsyncEmployee().event_counts(1))
+    finally:
+        tracing.enable(False)
+        tracing.metrics.reset()
+
+    queries = root.to_dict()["children"]
+    assert [query["kind"] for query in queries] == ["query", "query"]
+    assert queries[0]["name"] == tracing.statement_hash(Employee().statement("username"))
+    assert queries[0]["attrs"] == {"rows": 1}
+    assert root.totals()["query"][1] == 2
+    assert tracing.current() is None
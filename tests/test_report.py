@@ -0,0 +1,755 @@
+import sys
+import pytest
+from pathlib import Path
+project_root = Path(__file__).resolve().parent.parent
+
+# The report modules import each other as top level
+# modules, the same way `dashboard.py` does
+sys.path.insert(0, str(project_root / "report"))
+
+
+class FakeModel:
+    """
+    A stand-in for `Employee`/`Team` with a controllable data version.
+    """
+
+    name = "employee"
+    version = "1"
+
+    def data_version(self):
+        return self.version
+
+    def entity_version(self, entity_id):
+        return self.version
+
+
+def test_lru_cache_evicts_and_expires(monkeypatch):
+    """
+    Verify that the cache evicts the least recently used entry,
+    drops expired entries and counts hits and misses.
+    """
+    import cache
+
+    lru = cache.LRUCache(maxsize=2, ttl=10)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+    assert lru.get("b") is None
+
+    now = cache.time.monotonic()
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now + 60)
+    assert lru.get("a") is None
+
+    assert lru.stats()["hits"] == 1
+    assert lru.stats()["misses"] == 2
+
+
+def test_chart_cache_hits_until_data_changes():
+    """
+    Verify that a chart is rendered once per entity and data version.
+    """
+    from base_components import MatplotlibViz
+    import matplotlib.pyplot as plt
+
+    renders = []
+
+    class Chart(MatplotlibViz):
+        def visualization(self, entity_id, model):
+            renders.append(entity_id)
+            figure, ax = plt.subplots()
+            ax.plot([0, 1], [0, 1])
+            return figure
+
+    chart, model = Chart(), FakeModel()
+    first = chart("1", model)
+    assert chart("1", model).src == first.src
+    assert first.src.startswith("data:image/png;base64,")
+    assert renders == ["1"]
+
+    model.version = "2"
+    chart("1", model)
+    chart("2", model)
+    assert renders == ["1", "1", "2"]
+
+
+@pytest.fixture
+def client():
+    """
+    Return a test client for the dashboard app.
+    """
+    from starlette.testclient import TestClient
+    import dashboard
+
+    return TestClient(dashboard.app)
+
+
+def test_chart_endpoint_serves_cacheable_png(client):
+    """
+    Verify that report pages link their charts to the /chart endpoint,
+    which serves PNGs with an ETag and answers revalidation with 304.
+    """
+    import re
+
+    page = client.get("/team/1").text
+    urls = re.findall(r'<img src="(/chart/[^"]+)"', page)
+    assert len(urls) == 2
+
+    response = client.get(urls[0])
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert "immutable" in response.headers["cache-control"]
+
+    revalidated = client.get(urls[0], headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+    assert client.get("/chart/pie/team/1").status_code == 404
+    assert client.get("/chart/bar/team/999").status_code == 404
+    assert client.get("/chart/line/employee/abc").status_code == 404
+
+
+def test_svg_renderer_is_selectable_per_component():
+    """
+    Verify that a chart set to the SVG renderer is built from its
+    `svg_visualization` and keeps the dash-dot line styling.
+    """
+    import numpy as np
+    from base_components import MatplotlibViz, svg
+
+    class Chart(MatplotlibViz):
+        renderer = "svg"
+
+        def svg_visualization(self, entity_id, model):
+            return svg.line_chart(
+                np.array(["2024-01-01", "2024-01-02"]),
+                {"Positive": np.array([1, 3])},
+                title="Events",
+            )
+
+    image, media_type = Chart().image("1", FakeModel())
+    assert media_type == "image/svg+xml"
+    assert image.startswith(b"<svg")
+    assert b"<polyline" in image and svg.DASHDOT.encode() in image
+
+    component = Chart()("1", FakeModel())
+    assert str(component).startswith("<svg")
+
+
+def test_risk_scorer_matches_per_entity_predictions():
+    """
+    Verify that the batch scorer returns the same risk as scoring
+    each employee's and team's model data separately.
+    """
+    import numpy as np
+    from employee_events import Employee, Team
+    from risk import RiskScorer
+
+    scorer = RiskScorer()
+    predictor = scorer.predictor
+
+    for entity_id in (1, 2):
+        single = predictor.predict_proba(Employee().model_data(entity_id))[0, 1]
+        assert np.isclose(scorer.score("employee", str(entity_id)), single)
+
+        team = predictor.predict_proba(Team().model_data(entity_id))[:, 1].mean()
+        assert np.isclose(scorer.score("team", entity_id), team)
+
+    ranked = scorer.ranked("employee", top=3)
+    assert list(ranked["rank"]) == [1, 2, 3]
+    assert ranked["risk"].is_monotonic_decreasing
+
+    with pytest.raises(KeyError):
+        scorer.score("employee", "9999")
+
+
+def test_risk_endpoint_returns_ranked_table(client):
+    """
+    Verify that /risk returns the top N entities as JSON records.
+    """
+    records = client.get("/risk/team?top=2").json()
+    assert [record["rank"] for record in records] == [1, 2]
+    assert set(records[0]) == {"rank", "id", "name", "risk"}
+    assert client.get("/risk/manager").status_code == 404
+
+
+def test_exported_scorer_matches_pickled_model():
+    """
+    Verify that the NumPy scorer loaded from the exported coefficients
+    predicts the same probabilities as the pickled scikit-learn model.
+    """
+    import numpy as np
+    import pandas as pd
+    import utils
+
+    scorer = utils.load_model()
+    assert isinstance(scorer, utils.LogisticScorer)
+
+    model = utils._load_pickle()
+    data = pd.DataFrame(
+        np.random.default_rng(0).integers(0, 2000, size=(100, 2)),
+        columns=["positive_events", "negative_events"],
+    )
+    assert np.allclose(scorer.predict_proba(data), model.predict_proba(data))
+    assert (scorer.predict(data) == model.predict(data)).all()
+
+
+def test_load_model_falls_back_to_pickle(monkeypatch, tmp_path):
+    """
+    Verify that a missing or stale coefficients file makes `load_model`
+    unpickle the scikit-learn model instead.
+    """
+    import json
+    import utils
+
+    monkeypatch.setattr(utils, "coefficients_path", tmp_path / "model.json")
+    assert not isinstance(utils.load_model(), utils.LogisticScorer)
+
+    utils.export_model()
+    assert isinstance(utils.load_model(), utils.LogisticScorer)
+
+    artifact = json.loads(utils.coefficients_path.read_text())
+    artifact["source_sha256"] = "stale"
+    utils.coefficients_path.write_text(json.dumps(artifact))
+    assert not isinstance(utils.load_model(), utils.LogisticScorer)
+
+
+def test_concurrent_children_keep_order_and_fall_back():
+    """
+    Verify that a concurrent combined component renders its children
+    in parallel, keeps their order, and renders a placeholder for
+    children that fail or exceed the timeout.
+    """
+    import time
+    from fasthtml.common import P
+    from base_components import BaseComponent
+    from combined_components import CombinedComponent
+
+    class Slow(BaseComponent):
+        def __init__(self, text, delay):
+            self.text, self.delay = text, delay
+
+        def build_component(self, entity_id, model):
+            time.sleep(self.delay)
+            return P(self.text)
+
+    class Broken(BaseComponent):
+        def build_component(self, entity_id, model):
+            raise RuntimeError("query failed")
+
+    class Page(CombinedComponent):
+        concurrent = True
+        child_timeout = 0.5
+        children = [Slow("first", 0.2), Broken(), Slow("second", 0.2), Slow("late", 2)]
+
+    started = time.monotonic()
+    page = str(Page()("1", FakeModel()))
+    assert time.monotonic() - started < 1
+
+    assert page.index("first") < page.index("Broken is currently unavailable") < page.index("second")
+    assert "Slow is currently unavailable" in page
+    assert "late" not in page
+
+
+def test_child_timeout_starts_when_the_child_runs():
+    """
+    Verify that time a child spends queued for a worker does not count
+    against its timeout but is bounded by it, and that a child still
+    running after its timeout does not hold up later renders.
+    """
+    import threading
+    import time
+    from fasthtml.common import P
+    from base_components import BaseComponent
+    from combined_components import CombinedComponent
+
+    class Slow(BaseComponent):
+        def __init__(self, text, delay):
+            self.text, self.delay = text, delay
+
+        def build_component(self, entity_id, model):
+            time.sleep(self.delay)
+            return P(self.text)
+
+    class Queued(CombinedComponent):
+        concurrent = True
+        child_timeout = 0.3
+        max_workers = 1
+        children = [Slow("first", 0.2), Slow("second", 0.2)]
+
+    page = str(Queued()("1", FakeModel()))
+    assert "first" in page and "second" in page
+
+    release = threading.Event()
+
+    class Stuck(BaseComponent):
+        def build_component(self, entity_id, model):
+            release.wait(5)
+            return P("stuck")
+
+    class Single(CombinedComponent):
+        concurrent = True
+        child_timeout = 0.2
+        max_workers = 1
+        children = [Stuck()]
+
+    try:
+        assert "Stuck is currently unavailable" in str(Single()("1", FakeModel()))
+        Single.children = [Slow("next", 0)]
+        started = time.monotonic()
+        assert "next" in str(Single()("1", FakeModel()))
+        assert time.monotonic() - started < 1
+
+        # With the only worker busy, a child waits at most the timeout
+        # for it, and is cancelled rather than run late
+        Single.executor().submit(release.wait, 5)
+        started = time.monotonic()
+        assert "Slow is currently unavailable" in str(Single()("1", FakeModel()))
+        assert time.monotonic() - started < 1
+    finally:
+        release.set()
+
+
+def test_report_renders_are_reentrant():
+    """
+    Verify that rendering the shared report for employees and teams
+    from many threads at once gives the same output as rendering
+    each one alone.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from fasthtml.common import to_xml
+    from employee_events import Employee, Team
+    import dashboard
+
+    requests = [(str(entity_id), model) for entity_id in range(1, 5) for model in (Employee(), Team())]
+    expected = [to_xml(dashboard.report(entity_id, model)) for entity_id, model in requests]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        rendered = list(executor.map(
+            lambda request: to_xml(dashboard.report(*request)),
+            requests * 4,
+        ))
+
+    assert rendered == expected * 4
+    assert '<label for="selector">team</label>' in expected[1]
+    assert dashboard.Report.outer_div_type.children == ()
+
+
+def test_notes_table_paginates_and_sorts(client):
+    """
+    Verify that the notes table renders one page with a "load more"
+    row, that the next page is served as rows only, and that sorting
+    is applied by the server.
+    """
+    import re
+
+    headers = {"HX-Request": "true"}
+    first = client.get("/notes/team/1", headers=headers).text
+    assert first.count("<td") == 25 * 2 + 1
+    assert "Load more" in first
+    cursor = re.search(r"after=([^&\"]+)", first).group(1)
+
+    rest = client.get(f"/notes/team/1?after={cursor}", headers=headers).text
+    assert "<table" not in rest and "Load more" not in rest
+
+    by_text = client.get("/notes/team/1?sort=note", headers=headers).text
+    assert "after=25" in by_text
+    assert client.get("/notes/team/1?after=bad", headers=headers).status_code == 400
+    assert client.get("/notes/team/1?after=25", headers=headers).status_code == 400
+
+    dates = re.findall(r"<td>(\d{4}-\d{2}-\d{2})</td>", client.get(
+        "/notes/team/1?sort=note_date&order=desc", headers=headers
+    ).text)
+    assert dates == sorted(dates, reverse=True)
+
+
+def test_bundled_report_runs_no_further_queries(monkeypatch):
+    """
+    Verify that once a report's bundle is fetched, rendering the report
+    reads nothing else from the database and matches an unbundled render.
+    """
+    from fasthtml.common import to_xml
+    from employee_events import BundledModel, Employee
+    from employee_events.sql_execution import QueryMixin
+    import dashboard
+
+    expected = to_xml(dashboard.report("1", Employee()))
+    bundle = Employee().report_bundle("1", notes_limit=dashboard.NotesTable.page_size)
+
+    calls = []
+    for method in ("query", "pandas_query"):
+        original = getattr(QueryMixin, method)
+        monkeypatch.setattr(
+            QueryMixin, method,
+            lambda self, *args, original=original, **kwargs: calls.append(args) or original(self, *args, **kwargs),
+        )
+
+    assert to_xml(dashboard.report("1", BundledModel(Employee(), bundle))) == expected
+    assert calls == []
+
+
+def test_dropdown_is_cached_and_revalidated(client, monkeypatch):
+    """
+    Verify that /update_dropdown renders each entity's dropdown once per
+    data version, answers a matching If-None-Match with a 304, and
+    reads from the configured backend's models.
+    """
+    import dashboard
+    from employee_events import SnapshotTeam
+
+    dropdown = dashboard.DashboardFilters.children[1]
+    dropdown.cache.clear()
+
+    first = client.get("/update_dropdown?profile_type=Team")
+    assert first.status_code == 200 and "Bravo Team" in first.text
+    etag = first.headers["ETag"]
+
+    again = client.get("/update_dropdown?profile_type=Team")
+    assert again.text == first.text and again.headers["ETag"] == etag
+    assert dropdown.cache.stats()["hits"] >= 1
+
+    revalidated = client.get("/update_dropdown?profile_type=Team", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304 and revalidated.text == ""
+
+    used = []
+
+    class RecordedTeam(SnapshotTeam):
+        def data_version(self):
+            used.append(type(self))
+            return super().data_version()
+
+    monkeypatch.setitem(dashboard.models, "team", RecordedTeam)
+    assert client.get("/update_dropdown?profile_type=Team").text == first.text
+    assert used == [RecordedTeam]
+
+
+def test_search_endpoint_and_long_dropdowns(client, monkeypatch):
+    """
+    Verify that the search endpoint returns matching options only, and
+    that dropdowns longer than `max_options` offer the search box while
+    keeping the selected entity listed.
+    """
+    import dashboard
+
+    headers = {"HX-Request": "true"}
+    options = client.get("/search/team?q=bravo", headers=headers).text
+    assert options.count("<option") == 1 and "Bravo Team" in options
+    assert client.get("/search/team?q=%25", headers=headers).text.count("<option") == 0
+    assert client.get("/search/team?limit=2", headers=headers).text.count("<option") == 2
+    assert client.get("/search/nobody?q=a").status_code == 404
+
+    monkeypatch.setattr(dashboard.ReportDropdown, "max_options", 3)
+    dashboard.page_cache.clear()
+    page = client.get("/employee/10").text
+    assert 'hx-get="/search/employee"' in page
+    assert page.count("<option") == 4 and 'value="10" selected' in page
+
+
+def test_response_cache_serves_revalidates_and_persists(tmp_path):
+    """
+    Verify that the response cache renders a page once per data version,
+    serves it compressed, answers revalidation with 304, and that a new
+    process finds the page in the on-disk tier.
+    """
+    from starlette.applications import Starlette
+    from starlette.responses import HTMLResponse
+    from starlette.routing import Route
+    from starlette.testclient import TestClient
+    from cache import DiskCache
+    from response_cache import ResponseCacheMiddleware
+
+    renders = []
+    version = ["1"]
+
+    def page(request):
+        renders.append(request.path_params["iid"])
+        return HTMLResponse(f"<p>team {request.path_params['iid']} at {version[0]}</p>" * 50)
+
+    def client():
+        app = Starlette(routes=[Route("/team/{iid}", page)])
+        app.add_middleware(ResponseCacheMiddleware, version=lambda path: version[0], disk=DiskCache(tmp_path))
+        return TestClient(app)
+
+    first_client = client()
+    first = first_client.get("/team/1", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.text.startswith("<p>team 1 at 1</p>")
+
+    plain = first_client.get("/team/1", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers and plain.text == first.text
+    assert renders == ["1"]
+
+    etag, last_modified = first.headers["etag"], first.headers["last-modified"]
+    assert first_client.get("/team/1", headers={"If-None-Match": etag}).status_code == 304
+    assert first_client.get("/team/1", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    assert client().get("/team/1").text == first.text
+    assert renders == ["1"]
+
+    version[0] = "2"
+    changed = first_client.get("/team/1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert renders == ["1", "1"]
+
+
+def test_warm_cache_fills_disk_tiers_incrementally(tmp_path, monkeypatch):
+    """
+    Verify that the warm-up job stores every report page and chart in
+    the disk caches, and that a second run only re-renders reports
+    whose recorded version is out of date.
+    """
+    import io
+    import json
+    import warm_cache
+
+    monkeypatch.setenv("REPORT_CHART_RENDERER", "svg")
+    result = warm_cache.warm(tmp_path, entities=["team"], workers=1, out=io.StringIO())
+    assert result["warmed"] == 5 and result["failed"] == 0
+    assert len(list((tmp_path / "pages").glob("*.entry"))) == 5
+    assert len(list((tmp_path / "charts").glob("*.entry"))) == 10
+
+    manifest_path = tmp_path / warm_cache.MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text())
+    manifest["versions"]["team/2"] = "outdated"
+    manifest_path.write_text(json.dumps(manifest))
+
+    result = warm_cache.warm(tmp_path, entities=["team"], workers=1, out=io.StringIO())
+    assert result["warmed"] == 1 and result["skipped"] == 4
+
+
+def test_tracing_middleware_and_metrics_endpoint(client):
+    """
+    Verify that traced requests report a Server-Timing breakdown and are
+    aggregated per route at /metrics, and that nothing is recorded
+    while tracing is off.
+    """
+    from starlette.applications import Starlette
+    from starlette.responses import PlainTextResponse
+    from starlette.routing import Route
+    from starlette.testclient import TestClient
+    import dashboard
+    from employee_events import Employee, tracing
+    from request_tracing import TracingMiddleware
+
+    def page(request):
+        Employee().names()
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/page/{iid}", page)])
+    app.add_middleware(TracingMiddleware, router=app.router, server_timing=True)
+    traced = TestClient(app)
+
+    tracing.metrics.reset()
+    assert "server-timing" not in traced.get("/page/1").headers
+    assert tracing.metrics.durations == {}
+
+    tracing.enable()
+    try:
+        timing = traced.get("/page/1").headers["server-timing"]
+        assert timing.startswith('query;dur=') and '"1 spans"' in timing and ", total;dur=" in timing
+
+        # Render the report rather than serving it from the page cache
+        dashboard.page_cache.clear()
+        client.get("/team/3")
+    finally:
+        tracing.enable(False)
+
+    metrics = client.get("/metrics").text
+    assert 'report_requests_total{method="GET",route="/page/{iid}",status="200"} 1' in metrics
+    assert 'report_span_duration_seconds_count{kind="request",name="/team/{iid:str}"} 1' in metrics
+    assert 'report_span_duration_seconds_count{kind="component",name="Report"} 1' in metrics
+    assert f'report_query_rows_total{{statement="{tracing.statement_hash(Employee().statement("names"))}"}} 25' in metrics
+    assert 'report_cache_entries{cache="page"}' in metrics
+    assert 'report_pool_connections{state="open"}' in metrics
+    tracing.metrics.reset()
+
+
+def test_dashboard_imports_lazily_and_app_factory(tmp_path):
+    """
+    Verify that importing the dashboard neither loads the heavy
+    modules nor serves, and that `create_app` builds independent apps.
+    """
+    import subprocess
+    from starlette.testclient import TestClient
+
+    heavy = ("pandas", "numpy", "matplotlib", "sklearn")
+    child = subprocess.run(
+        [sys.executable, "-c",
+         f"import sys; sys.path.insert(0, {str(project_root / 'report')!r}); import dashboard; "
+         f"print([name for name in {heavy!r} if name in sys.modules])"],
+        cwd=tmp_path, capture_output=True, text=True, timeout=60,
+    )
+    assert child.returncode == 0, child.stderr
+    assert child.stdout.strip() == "[]"
+
+    import dashboard
+
+    app = dashboard.create_app()
+    assert app is not dashboard.app
+    assert TestClient(app).get("/team/1").status_code == 200
+
+
+def test_snapshot_backend_scores_without_sqlite_queries(tmp_path):
+    """
+    Verify that with REPORT_BACKEND=snapshot the bar charts and the
+    risk table are served from the in-memory copy, without opening a
+    connection of the SQLite pool.
+    """
+    import os
+    import subprocess
+
+    code = f"""
+import sys
+sys.path.insert(0, {str(project_root / 'report')!r})
+from starlette.testclient import TestClient
+from employee_events.sql_execution import pool
+import dashboard
+
+client = TestClient(dashboard.app)
+for path in ("/chart/bar/employee/1", "/chart/bar/team/1", "/risk/team"):
+    assert client.get(path).status_code == 200, path
+print(pool.stats()["open"])
+"""
+    child = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=tmp_path, capture_output=True, text=True, timeout=120,
+        env={**os.environ, "REPORT_BACKEND": "snapshot"},
+    )
+    assert child.returncode == 0, child.stderr
+    assert child.stdout.strip() == "0"
+
+
+def test_serve_recycles_workers_and_reloads_on_database_change(tmp_path):
+    """
+    Verify that the pre-forked server answers from several workers,
+    replaces a worker after its request limit, reloads when the
+    database changes and stops cleanly on SIGTERM.
+    """
+    import shutil
+    import signal
+    import socket
+    import sqlite3
+    import subprocess
+    import time
+    import urllib.request
+
+    db = tmp_path / "employee_events.db"
+    shutil.copy(project_root / "python-package" / "employee_events" / "employee_events.db", db)
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    log = tmp_path / "serve.log"
+    with log.open("w") as stderr:
+        server = subprocess.Popen(
+            [sys.executable, str(project_root / "report" / "serve.py"),
+             "--port", str(port), "--workers", "2", "--db", str(db),
+             "--max-requests", "2", "--max-requests-jitter", "0",
+             "--watch-interval", "0.2", "--log-level", "warning"],
+            cwd=tmp_path, stderr=stderr,
+        )
+
+    def wait_for(text, timeout=20):
+        deadline = time.monotonic() + timeout
+        while text not in log.read_text():
+            assert time.monotonic() < deadline, log.read_text()
+            assert server.poll() is None, log.read_text()
+            time.sleep(0.1)
+
+    def get(path):
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=10) as response:
+            return response.status
+
+    try:
+        wait_for("with 2 workers")
+        deadline = time.monotonic() + 20
+        while True:
+            try:
+                assert get("/team/1") == 200
+                break
+            except OSError:
+                assert time.monotonic() < deadline, log.read_text()
+                time.sleep(0.1)
+
+        for _ in range(6):
+            assert get("/team/1") == 200
+        wait_for("recycled")
+
+        with sqlite3.connect(db) as connection:
+            connection.execute(
+                "INSERT INTO notes (employee_id, team_id, note, note_date) VALUES (1, 1, 'Moved desks', '2024-01-02')"
+            )
+            connection.execute(
+                "INSERT INTO employee_events (event_date, employee_id, team_id, positive_events, negative_events) "
+                "VALUES ('2024-01-02', 1, 1, 3, 0)"
+            )
+        wait_for("Rolled up 1 new event rows")
+        wait_for("Reloading")
+        assert get("/employee/1") == 200
+        with sqlite3.connect(db) as connection:
+            assert connection.execute("SELECT last_rowid FROM rollup_watermark").fetchone()[0] == \
+                connection.execute("SELECT MAX(rowid) FROM employee_events").fetchone()[0]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=30) == 0
+
+
+def test_charts_render_concurrently_without_pyplot():
+    """
+    Verify that charts drawn on pooled figures render the same from
+    many threads as from one, reuse the pool's figures and leave
+    pyplot's figure registry empty.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    import matplotlib.pyplot as plt
+    from employee_events import Employee, Team
+    import dashboard
+
+    line_chart, bar_chart = dashboard.Visualizations.children
+    requests = [
+        (chart, str(entity_id), model)
+        for chart in (line_chart, bar_chart)
+        for entity_id in range(1, 4)
+        for model in (Employee(), Team())
+    ]
+    expected = [chart.render_png(entity_id, model) for chart, entity_id, model in requests]
+
+    figure, _ = dashboard.MatplotlibViz.figures.acquire()
+    dashboard.MatplotlibViz.figures.release(figure)
+    reused, _ = line_chart.subplots()
+    assert reused is figure
+    dashboard.MatplotlibViz.figures.release(reused)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        rendered = list(executor.map(lambda request: request[0].render_png(*request[1:]), requests * 4))
+
+    assert rendered == expected * 4
+    assert plt.get_fignums() == []
+    assert dashboard.Visualizations.concurrent
+
+
+def test_pages_with_placeholders_are_not_cached(client, monkeypatch):
+    """
+    Verify that a page where a component failed is sent with
+    `Cache-Control: no-store` and rendered again on the next request.
+    """
+    import dashboard
+
+    failures = [RuntimeError("database is locked")]
+    build_component = dashboard.NotesTable.build_component
+
+    def flaky(self, *args, **kwargs):
+        if failures:
+            raise failures.pop()
+        return build_component(self, *args, **kwargs)
+
+    monkeypatch.setattr(dashboard.NotesTable, "build_component", flaky)
+    dashboard.page_cache.clear()
+
+    degraded = client.get("/team/3")
+    assert degraded.status_code == 200 and degraded.headers["cache-control"] == "no-store"
+    assert "NotesTable is currently unavailable" in degraded.text
+
+    recovered = client.get("/team/3")
+    assert "currently unavailable" not in recovered.text
+    assert recovered.headers["cache-control"] == "no-cache" and "etag" in recovered.headers